@@ -1,11 +1,27 @@
+import heapq
 import os
 import random
+import sys
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import accumulate, chain, islice
 
 #  caminhos projeto  
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PASTA_ENTRADAS = os.path.join(BASE_DIR, "..", "entradas")
 PASTA_SAIDAS = os.path.join(BASE_DIR, "..", "saidas")
 
+# acima disso (itens x capacidade) o exato usa branch-and-bound em vez da DP
+LIMITE_DP_CELULAS = 2 * 10**8
+
+# "busca_local" (flip aleatorio), "vizinhanca" (melhor movimento), "exato" (DP / branch-and-bound)
+# ou "grande" (leitura em blocos + guloso com nucleo exato, para milhoes de itens)
+MODO = "busca_local"
+
+# fixa itens por limites antes de rodar o MODO (so o nucleo e buscado)
+REDUZIR = False
+
 
 def ler_instancia(caminho: str):
     #Le o arquivo no formato
@@ -27,6 +43,76 @@ def ler_instancia(caminho: str):
     return capacidade, beneficios, custos
 
 
+# Representacao compacta da solucao
+# 1 bit por item num bytearray (lista de 0/1 gasta 8 bytes por item so de ponteiro)
+# chave() e Zobrist, mantida a cada flip -> O(1); a classe e mutavel, entao nao
+# e hashable (use sol.chave() em sets/dicts, nunca o proprio objeto)
+
+_ZOBRIST = {}
+
+
+def _tabela_zobrist(n):
+    tab = _ZOBRIST.get(n)
+    if tab is None:
+        rng = random.Random(n)  # nao mexe no random global
+        tab = [rng.getrandbits(64) for _ in range(n)]
+        _ZOBRIST[n] = tab
+    return tab
+
+
+_BITS_BYTE = [tuple((b >> k) & 1 for k in range(8)) for b in range(256)]
+
+
+class SolucaoBits:
+    __slots__ = ("n", "bits", "h", "zob")
+
+    def __init__(self, n, bits=None, h=0):
+        self.n = n
+        self.bits = bytearray((n + 7) // 8) if bits is None else bits
+        self.h = h
+        self.zob = _tabela_zobrist(n)
+
+    @classmethod
+    def de_lista(cls, sol):
+        s = cls(len(sol))
+        for i, bit in enumerate(sol):
+            if bit:
+                s.flip(i)
+        return s
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        return (self.bits[i >> 3] >> (i & 7)) & 1
+
+    def __setitem__(self, i, v):
+        if ((self.bits[i >> 3] >> (i & 7)) & 1) != (1 if v else 0):
+            self.flip(i)
+
+    def flip(self, i):
+        self.bits[i >> 3] ^= 1 << (i & 7)
+        self.h ^= self.zob[i]
+
+    def __iter__(self):
+        bits = chain.from_iterable(map(_BITS_BYTE.__getitem__, self.bits))
+        return islice(bits, self.n)
+
+    def popcount(self):
+        return int.from_bytes(self.bits, "little").bit_count()
+
+    def copy(self):
+        return SolucaoBits(self.n, bytearray(self.bits), self.h)
+
+    def chave(self):
+        return self.h
+
+    def __eq__(self, outra):
+        if not isinstance(outra, SolucaoBits):
+            return NotImplemented
+        return self.n == outra.n and self.bits == outra.bits
+
+
 def avalia(sol, beneficios, custos):
     #Retorna beneficio_total e custo_total
     bt = 0
@@ -85,36 +171,129 @@ def vizinho_flip(sol):
     return v
 
 
+# Estado incremental da busca
+# guarda beneficio/custo acumulados e um heap com a posicao (na ordem de densidade)
+# dos itens selecionados, assim flip + reparo + desfazer nao reavaliam a solucao toda
+
+def ordem_densidade(beneficios, custos):
+    #itens em ordem crescente de densidade b/c (mesmo criterio do reparar)
+    #retorna (ordem, rank) com rank[i] = posicao do item i na ordem
+    def dens(i):
+        if custos[i] == 0:
+            return float("inf")
+        return beneficios[i] / custos[i]
+
+    ordem = sorted(range(len(beneficios)), key=lambda i: (dens(i), i))
+    rank = [0] * len(ordem)
+    for r, i in enumerate(ordem):
+        rank[i] = r
+    return ordem, rank
+
+
+class EstadoMochila:
+    __slots__ = ("sol", "bt", "ct", "capacidade", "beneficios", "custos", "ordem", "rank", "heap")
+
+    def __init__(self, sol, capacidade, beneficios, custos, ordem=None):
+        if ordem is None:
+            ordem = ordem_densidade(beneficios, custos)
+        self.sol = sol
+        self.capacidade = capacidade
+        self.beneficios = beneficios
+        self.custos = custos
+        self.ordem, self.rank = ordem
+        self.bt, self.ct = avalia(sol, beneficios, custos)
+        self._refazer_heap()
+
+    def _refazer_heap(self):
+        rank = self.rank
+        self.heap = [rank[i] for i, bit in enumerate(self.sol) if bit]
+        heapq.heapify(self.heap)
+
+    def flip(self, i):
+        #O(log n): atualiza totais, heap fica com entradas velhas (descartadas no pop)
+        if self.sol[i]:
+            self.sol[i] = 0
+            self.bt -= self.beneficios[i]
+            self.ct -= self.custos[i]
+        else:
+            self.sol[i] = 1
+            self.bt += self.beneficios[i]
+            self.ct += self.custos[i]
+            heapq.heappush(self.heap, self.rank[i])
+            if len(self.heap) > 2 * len(self.sol) + 16:
+                self._refazer_heap()
+
+    def reparar(self):
+        #mesma regra do reparar(): tira o selecionado de menor densidade ate caber
+        #retorna os itens removidos (para desfazer)
+        removidos = []
+        heap = self.heap
+        sol = self.sol
+        ordem = self.ordem
+        while self.ct > self.capacidade and heap:
+            i = ordem[heapq.heappop(heap)]
+            if sol[i]:
+                self.flip(i)
+                removidos.append(i)
+        return removidos
+
+    def mover(self, i):
+        #flip em i + reparo; retorna a lista de itens alterados
+        self.flip(i)
+        if self.ct > self.capacidade:
+            return [i] + self.reparar()
+        return [i]
+
+    def desfazer(self, mudancas):
+        for i in reversed(mudancas):
+            self.flip(i)
+
+
 def busca_local(capacidade, beneficios, custos, max_iter=200000, reinicios=30):
     n = len(beneficios)
+    if n == 0:
+        return SolucaoBits(0), 0, 0
+    ordem = ordem_densidade(beneficios, custos)
 
     melhor = None
     melhor_benef = -1
     melhor_custo = None
 
+
     for _r in range(reinicios):
-        sol = solucao_inicial_aleatoria(n, capacidade, beneficios, custos)
-        b, c = avalia(sol, beneficios, custos)
+        sol = SolucaoBits.de_lista(solucao_inicial_aleatoria(n, capacidade, beneficios, custos))
+        est = EstadoMochila(sol, capacidade, beneficios, custos, ordem)
 
-        if b > melhor_benef:
-            melhor, melhor_benef, melhor_custo = sol[:], b, c
+        if est.bt > melhor_benef:
+            melhor, melhor_benef, melhor_custo = sol.copy(), est.bt, est.ct
 
-        # hill climbing com reparo
+        # hill climbing com reparo (movimento aplicado e desfeito no proprio estado)
+        # vizinho = (chave da solucao atual, item do flip); vizinhos ja avaliados a partir
+        # da solucao atual sao pulados sem flip/reparo. Todos avaliados = otimo local
         sem_melhora = 0
+        atual = sol.chave()
+        vistos = set()
         for _ in range(max_iter):
-            v = vizinho_flip(sol)
-            v = reparar(v, capacidade, beneficios, custos)
-            vb, vc = avalia(v, beneficios, custos)
+            i = random.randrange(n)
+            if (atual, i) in vistos:
+                continue
+            vistos.add((atual, i))
+
+            b = est.bt
+            mudancas = est.mover(i)
 
-            if vb > b:  
-                sol = v
-                b, c = vb, vc
+            if est.bt > b:
+                atual = sol.chave()
+                vistos.clear()
                 sem_melhora = 0
 
-                if b > melhor_benef:
-                    melhor, melhor_benef, melhor_custo = sol[:], b, c
+                if est.bt > melhor_benef:
+                    melhor, melhor_benef, melhor_custo = sol.copy(), est.bt, est.ct
             else:
+                est.desfazer(mudancas)
                 sem_melhora += 1
+                if len(vistos) == n:
+                    break  # nenhum vizinho melhora
 
             # criterio de convergência 
             if sem_melhora > 5000:
@@ -123,7 +302,590 @@ def busca_local(capacidade, beneficios, custos, max_iter=200000, reinicios=30):
     return melhor, melhor_benef, melhor_custo
 
 
-def salvar_saida(caminho_saida, sol, melhor_benef, melhor_custo, capacidade):
+# Re-otimizacao (warm start)
+# delta = {"capacidade": nova, "alterados": {i: (b, c)}, "removidos": [i, ...],
+#          "adicionados": [(b, c), ...]}  -> indices sempre da instancia anterior,
+# adicionados vao para o fim. Todas as chaves sao opcionais
+
+def aplicar_delta(capacidade, beneficios, custos, sol, delta):
+    #Retorna (capacidade, beneficios, custos, sol, afetados) ja na numeracao nova
+    #sol mantem os bits antigos (novos itens entram em 0), pode estar inviavel
+    capacidade = delta.get("capacidade", capacidade)
+    beneficios = list(beneficios)
+    custos = list(custos)
+    bits = list(sol)
+
+    alterados = set()
+    for i, (b, c) in delta.get("alterados", {}).items():
+        beneficios[i] = b
+        custos[i] = c
+        alterados.add(i)
+
+    removidos = set(delta.get("removidos", ()))
+    if removidos:
+        manter = [i for i in range(len(bits)) if i not in removidos]
+        novo_idx = {i: k for k, i in enumerate(manter)}
+        beneficios = [beneficios[i] for i in manter]
+        custos = [custos[i] for i in manter]
+        bits = [bits[i] for i in manter]
+        alterados = {novo_idx[i] for i in alterados if i in novo_idx}
+
+    afetados = set(alterados)
+    for b, c in delta.get("adicionados", ()):
+        afetados.add(len(bits))
+        beneficios.append(b)
+        custos.append(c)
+        bits.append(0)
+
+    return capacidade, beneficios, custos, bits, afetados
+
+
+def reotimizar(sol_anterior, capacidade, beneficios, custos, delta, max_iter=20000):
+    #Retorna ((capacidade, beneficios, custos), sol, beneficio, custo) da instancia nova
+    #reparo + preenchimento guloso + hill climbing so com flips nos itens afetados
+    capacidade, beneficios, custos, bits, afetados = aplicar_delta(
+        capacidade, beneficios, custos, sol_anterior, delta)
+    inst = (capacidade, beneficios, custos)
+    n = len(beneficios)
+
+    antes = bits[:]
+    bits = reparar(bits, capacidade, beneficios, custos)
+    ordem = ordem_densidade(beneficios, custos)
+    est = EstadoMochila(SolucaoBits.de_lista(bits), capacidade, beneficios, custos, ordem)
+    sol = est.sol
+
+    # capacidade que sobrou (aumento de capacidade ou itens tirados): completa por densidade
+    for i in reversed(ordem[0]):
+        if not sol[i] and est.ct + custos[i] <= capacidade and beneficios[i] > 0:
+            est.flip(i)
+    afetados.update(i for i in range(n) if sol[i] != antes[i])
+
+    afetados = sorted(afetados)
+    if afetados:
+        sem_melhora = 0
+        for _ in range(max_iter):
+            b = est.bt
+            mudancas = est.mover(random.choice(afetados))
+            if est.bt > b:
+                sem_melhora = 0
+            else:
+                est.desfazer(mudancas)
+                sem_melhora += 1
+            if sem_melhora > 20 * len(afetados) + 200:
+                break
+
+    return inst, sol, est.bt, est.ct
+
+
+# Reducao (problema nucleo)
+# limites de Dantzig com o item j forcado dentro/fora; se o limite fica abaixo de
+# um limite inferior conhecido, x_j tem o valor oposto em toda solucao otima
+
+def reduzir_instancia(capacidade, beneficios, custos, lb=None):
+    #Retorna (capacidade_nucleo, beneficios_nucleo, custos_nucleo, reducao)
+    #os tres primeiros tem o formato de ler_instancia -> qualquer solver roda no nucleo
+    #expandir_solucao() leva a solucao do nucleo de volta para a instancia original
+    n = len(beneficios)
+    fixos_1 = []
+    fixos_0 = []
+    livres = []
+    for i in range(n):
+        if custos[i] == 0:
+            (fixos_1 if beneficios[i] > 0 else fixos_0).append(i)
+        elif custos[i] > capacidade or beneficios[i] <= 0:
+            fixos_0.append(i)
+        else:
+            livres.append(i)
+
+    cap = capacidade - sum(custos[i] for i in fixos_1)
+
+    itens = sorted(livres, key=lambda i: beneficios[i] / custos[i], reverse=True)
+    m = len(itens)
+    p = [beneficios[i] for i in itens]
+    w = [custos[i] for i in itens]
+    Wp = list(accumulate(w, initial=0))
+    Pp = list(accumulate(p, initial=0))
+
+    def limite_sem(c, j):
+        #limite de Dantzig sem o item j, capacidade c
+        if c < 0:
+            return -1
+        if Wp[j] <= c:
+            k = bisect_right(Wp, c + w[j]) - 1
+            val = Pp[k] - p[j]
+            resto = c - (Wp[k] - w[j])
+        else:
+            k = bisect_right(Wp, c) - 1
+            val = Pp[k]
+            resto = c - Wp[k]
+        if k < m:
+            val += resto * p[k] // w[k]
+        return val
+
+    if lb is None:
+        # guloso na ordem de densidade
+        lb = 0
+        r = cap
+        for k in range(m):
+            if w[k] <= r:
+                r -= w[k]
+                lb += p[k]
+    else:
+        lb -= sum(beneficios[i] for i in fixos_1)
+
+    nucleo = []
+    cap_nucleo = cap
+    for j in range(m):
+        if p[j] + limite_sem(cap - w[j], j) < lb:
+            fixos_0.append(itens[j])
+        elif limite_sem(cap, j) < lb:
+            fixos_1.append(itens[j])
+            cap_nucleo -= w[j]
+        else:
+            nucleo.append(itens[j])
+
+    nucleo.sort()
+    reducao = {
+        "n": n,
+        "nucleo": nucleo,
+        "fixos_1": sorted(fixos_1),
+        "fixos_0": sorted(fixos_0),
+    }
+    return (
+        cap_nucleo,
+        [beneficios[i] for i in nucleo],
+        [custos[i] for i in nucleo],
+        reducao,
+    )
+
+
+def expandir_solucao(sol_nucleo, reducao):
+    sol = [0] * reducao["n"]
+    for i in reducao["fixos_1"]:
+        sol[i] = 1
+    for k, i in enumerate(reducao["nucleo"]):
+        if sol_nucleo[k]:
+            sol[i] = 1
+    return sol
+
+
+# Vizinhanca completa (melhor melhora)
+# a cada passo pontua de uma vez todos os flips (com o reparo do reparar()) e todas
+# as trocas "entra j / sai i" usando prefixos + busca binaria, e aplica o melhor
+
+def _melhor_movimento(sol, folga, beneficios, custos, ordem, rank):
+    #retorna (ganho, entra, saem) do melhor movimento que melhora, ou None
+    sel = [i for i in ordem if sol[i]]  # ordem de remocao do reparo
+    m = len(sel)
+    Cs = list(accumulate((custos[i] for i in sel), initial=0))
+    Ps = list(accumulate((beneficios[i] for i in sel), initial=0))
+    fora = [j for j in range(len(sol)) if not sol[j]]
+
+    melhor = None
+    melhor_ganho = 0
+
+    # flip j (0 -> 1) + reparo: sai o menor prefixo de baixa densidade que cobre o excesso
+    for j in fora:
+        exc = custos[j] - folga
+        if exc <= 0:
+            t = 0
+        else:
+            t = bisect_left(Cs, exc)
+            if t > m or rank[sel[t - 1]] > rank[j]:
+                continue  # o reparo tiraria o proprio j
+        g = beneficios[j] - Ps[t]
+        if g > melhor_ganho:
+            melhor_ganho = g
+            melhor = (j, t)
+
+    if melhor is not None:
+        j, t = melhor
+        melhor = (melhor_ganho, j, sel[:t])
+
+    # troca: sai i, entra o melhor j com custo <= folga + c_i
+    fora.sort(key=custos.__getitem__)
+    cs = [custos[j] for j in fora]
+    melhor_ate = []
+    arg = None
+    for j in fora:
+        if arg is None or beneficios[j] > beneficios[arg]:
+            arg = j
+        melhor_ate.append(arg)
+
+    for i in sel:
+        k = bisect_right(cs, folga + custos[i])
+        if k:
+            j = melhor_ate[k - 1]
+            g = beneficios[j] - beneficios[i]
+            if g > melhor_ganho:
+                melhor_ganho = g
+                melhor = (g, j, [i])
+
+    return melhor
+
+
+def descida_vizinhanca(sol, capacidade, beneficios, custos, ordem=None, max_passos=100000):
+    #aplica o melhor movimento ate nao haver melhora; sol precisa ser viavel
+    if ordem is None:
+        ordem = ordem_densidade(beneficios, custos)
+    ordem_itens, rank = ordem
+
+    bt, ct = avalia(sol, beneficios, custos)
+    for _ in range(max_passos):
+        mov = _melhor_movimento(sol, capacidade - ct, beneficios, custos, ordem_itens, rank)
+        if mov is None:
+            break
+        _, j, saem = mov
+        sol[j] = 1
+        bt += beneficios[j]
+        ct += custos[j]
+        for i in saem:
+            sol[i] = 0
+            bt -= beneficios[i]
+            ct -= custos[i]
+    return sol, bt, ct
+
+
+def busca_vizinhanca(capacidade, beneficios, custos, reinicios=30, max_passos=100000):
+    n = len(beneficios)
+    ordem = ordem_densidade(beneficios, custos)
+
+    melhor = None
+    melhor_benef = -1
+    melhor_custo = None
+
+    for _r in range(reinicios):
+        sol = solucao_inicial_aleatoria(n, capacidade, beneficios, custos)
+        sol, b, c = descida_vizinhanca(sol, capacidade, beneficios, custos, ordem, max_passos)
+        if b > melhor_benef:
+            melhor, melhor_benef, melhor_custo = sol.copy(), b, c
+
+    return melhor, melhor_benef, melhor_custo
+
+
+# Solver exato
+# DP sobre a capacidade com a linha inteira empacotada num int (um campo de F bits
+# por capacidade, max campo a campo com truque SWAR); itens recuperados por divisao
+# e conquista (estilo Hirschberg), memoria O(capacidade)
+# se a tabela nao couber -> branch-and-bound com limite de Dantzig
+
+def _largura_campo(total_benef):
+    #bits por campo (um bit de guarda no topo); None se nao cabe em 64
+    for F in (16, 32, 64):
+        if total_benef < (1 << (F - 1)):
+            return F
+    return None
+
+
+_TIPO_ARRAY = {16: "H", 32: "I", 64: "Q"}
+
+
+def _dp_linha(itens, cap, beneficios, custos, F):
+    #linha[c] = melhor benefício com custo <= c usando so 'itens'
+    nf = cap + 1
+    B = F - 1
+    um = (1).to_bytes(F // 8, "little")
+    ONES = int.from_bytes(um * nf, "little")
+    H = ONES << B
+    FULL = (1 << (nf * F)) - 1
+
+    A = 0
+    for i in itens:
+        w = custos[i]
+        if w > cap:
+            continue
+        S = ((A + ONES * beneficios[i]) << (w * F)) & FULL
+        G = ((A | H) - S) & H      # guarda ligada onde A >= S
+        M = G - (G >> B)           # mascara cheia nesses campos
+        A = S ^ ((A ^ S) & M)
+
+    #campo c comeca no bit c*F: serializa em little-endian (campo 0 primeiro) e
+    #so entao ajusta a ordem dos bytes de cada elemento para a da maquina
+    linha = array(_TIPO_ARRAY[F], A.to_bytes(nf * F // 8, "little"))
+    if sys.byteorder == "big":
+        linha.byteswap()
+    return linha
+
+
+def _dp_escolher(itens, caps, beneficios, custos, F):
+    #caps: capacidades pedidas (as linhas de cada no servem para todas)
+    #retorna {cap: itens escolhidos}
+    soma = 0
+    for i in itens:
+        soma += custos[i]
+
+    res = {}
+    resto = []
+    for cap in set(caps):
+        if soma <= cap:
+            res[cap] = list(itens)
+        elif cap <= 0 or len(itens) <= 1:
+            res[cap] = []  # unico item e nao cabe (caso acima ja cobriu quando cabe)
+        else:
+            resto.append(cap)
+    if not resto:
+        return res
+
+    meio = len(itens) // 2
+    esq, dir_ = itens[:meio], itens[meio:]
+    cmax = max(resto)
+    L = _dp_linha(esq, cmax, beneficios, custos, F)
+    R = _dp_linha(dir_, cmax, beneficios, custos, F)
+
+    # divide cada capacidade entre as duas metades
+    corte = {}
+    for cap in resto:
+        corte[cap] = max(range(cap + 1), key=lambda c: L[c] + R[cap - c])
+    res_esq = _dp_escolher(esq, corte.values(), beneficios, custos, F)
+    res_dir = _dp_escolher(dir_, [cap - c for cap, c in corte.items()], beneficios, custos, F)
+    for cap, c in corte.items():
+        res[cap] = res_esq[c] + res_dir[cap - c]
+    return res
+
+
+def _branch_and_bound(itens, cap, beneficios, custos, prazo, max_nos, incumbente=None):
+    #Horowitz-Sahni: DFS nos itens em ordem decrescente de densidade
+    #poda com o limite de Dantzig (relaxacao linear)
+    #incumbente: itens de uma solucao viavel conhecida (opcional)
+    #retorna (escolhidos, terminou)
+    itens = sorted((i for i in itens if custos[i] <= cap), key=lambda i: beneficios[i] / custos[i],
+                   reverse=True)
+    n = len(itens)
+    p = [beneficios[i] for i in itens]
+    w = [custos[i] for i in itens]
+
+    Wp = [0] * (n + 1)
+    Pp = [0] * (n + 1)
+    for k in range(n):
+        Wp[k + 1] = Wp[k] + w[k]
+        Pp[k + 1] = Pp[k] + p[k]
+
+    def limite(j, r):
+        k = bisect_right(Wp, Wp[j] + r, j) - 1
+        val = Pp[k] - Pp[j]
+        if k < n:
+            val += (r - (Wp[k] - Wp[j])) * p[k] // w[k]
+        return val
+
+    # incumbente guloso
+    melhor = 0
+    melhor_x = []
+    r = cap
+    for k in range(n):
+        if w[k] <= r:
+            r -= w[k]
+            melhor += p[k]
+            melhor_x.append(k)
+
+    if incumbente is not None:
+        pos = {i: k for k, i in enumerate(itens)}
+        inc = [pos[i] for i in incumbente if i in pos]
+        if sum(w[k] for k in inc) <= cap and sum(p[k] for k in inc) > melhor:
+            melhor = sum(p[k] for k in inc)
+            melhor_x = inc
+
+    tomados = []
+    j = 0
+    r = cap
+    P = 0
+    nos = 0
+    terminou = True
+
+    while True:
+        nos += 1
+        if nos % 4096 == 0:
+            if (prazo is not None and time.time() > prazo) or (max_nos is not None and nos > max_nos):
+                terminou = False
+                break
+
+        if P + limite(j, r) > melhor:
+            # avanco guloso
+            while j < n and w[j] <= r:
+                r -= w[j]
+                P += p[j]
+                tomados.append(j)
+                j += 1
+            if j < n:
+                j += 1  # item j nao cabe, fica fora
+                continue
+            if P > melhor:
+                melhor = P
+                melhor_x = tomados[:]
+
+        # backtrack: tira o ultimo item tomado
+        if not tomados:
+            break
+        k = tomados.pop()
+        r += w[k]
+        P -= p[k]
+        j = k + 1
+
+    return [itens[k] for k in melhor_x], terminou
+
+
+def _separar_itens(capacidade, beneficios, custos):
+    #custo zero entra sempre; custo > capacidade ou benefício <= 0 nunca
+    #retorna (sol com os fixos, itens livres, capacidade que sobra)
+    n = len(beneficios)
+    sol = [0] * n
+    itens = []
+    for i in range(n):
+        if custos[i] == 0:
+            sol[i] = 1 if beneficios[i] > 0 else 0
+        elif custos[i] <= capacidade and beneficios[i] > 0:
+            itens.append(i)
+    cap = capacidade - sum(custos[i] for i in range(n) if sol[i])
+    return sol, itens, cap
+
+
+def resolver_exato(capacidade, beneficios, custos, tempo_limite_s=60.0, max_nos=None,
+                   limite_dp=LIMITE_DP_CELULAS):
+    #Retorna sol, beneficio, custo, otimo (True se o otimo foi provado)
+    sol, itens, cap = _separar_itens(capacidade, beneficios, custos)
+
+    F = _largura_campo(sum(beneficios[i] for i in itens))
+    otimo = True
+    if F is not None and len(itens) * (cap + 1) <= limite_dp:
+        escolhidos = _dp_escolher(itens, [cap], beneficios, custos, F)[cap]
+    else:
+        prazo = None if tempo_limite_s is None else time.time() + tempo_limite_s
+        escolhidos, otimo = _branch_and_bound(itens, cap, beneficios, custos, prazo, max_nos)
+
+    for i in escolhidos:
+        sol[i] = 1
+    b, c = avalia(sol, beneficios, custos)
+    return sol, b, c, otimo
+
+
+def resolver_capacidades(capacidades, beneficios, custos, tempo_limite_s=60.0, max_nos=None,
+                         limite_dp=LIMITE_DP_CELULAS):
+    #Mesmos itens, varias capacidades
+    #Retorna [(sol, beneficio, custo, otimo)] na ordem de 'capacidades'
+    #DP: uma unica recursao, as linhas de cada no servem para todas as capacidades
+    #B&B: capacidades em ordem crescente, a solucao anterior entra como incumbente
+    base, itens, cap_max = _separar_itens(max(capacidades), beneficios, custos)
+    caps = [max(0, c) for c in capacidades]
+
+    F = _largura_campo(sum(beneficios[i] for i in itens))
+    escolhas = {}
+    otimos = {}
+    if F is not None and len(itens) * (cap_max + 1) <= limite_dp:
+        escolhas = _dp_escolher(itens, caps, beneficios, custos, F)
+        otimos = dict.fromkeys(escolhas, True)
+    else:
+        inc = None
+        for cap in sorted(set(caps)):
+            prazo = None if tempo_limite_s is None else time.time() + tempo_limite_s
+            inc, otimos[cap] = _branch_and_bound(itens, cap, beneficios, custos, prazo, max_nos, inc)
+            escolhas[cap] = inc
+
+    res = []
+    for cap in caps:
+        sol = base[:]
+        for i in escolhas[cap]:
+            sol[i] = 1
+        b, c = avalia(sol, beneficios, custos)
+        res.append((sol, b, c, otimos[cap]))
+    return res
+
+
+# Instancias grandes (10^5 .. 10^6+ itens)
+# leitura em blocos direto para array('i') (4 bytes por valor, sem lista de linhas),
+# guloso por densidade com prefixo acumulado + bisect, e melhoria exata so numa
+# janela de itens em volta do item de quebra (problema nucleo)
+
+def ler_instancia_grande(caminho, bloco=1 << 20):
+    #mesmo formato de ler_instancia; retorna capacidade, beneficios, custos (array 'i')
+    valores = [array("q"), array("i"), array("i")]
+    linha = 0
+    em_linha = False  # a linha fisica atual ja teve algum numero
+    resto = b""
+
+    with open(caminho, "rb") as f:
+        while linha < 3:
+            dados = f.read(bloco)
+            if not dados:
+                toks = resto.split()
+                if toks:
+                    valores[linha].extend(map(int, toks))
+                break
+
+            partes = (resto + dados).split(b"\n")
+            ult = partes.pop()
+            for parte in partes:
+                toks = parte.split()
+                if toks:
+                    valores[linha].extend(map(int, toks))
+                    em_linha = True
+                if em_linha:
+                    linha += 1
+                    em_linha = False
+                    if linha == 3:
+                        break
+            else:
+                # linha incompleta: consome ate o ultimo separador, guarda o numero cortado
+                k = max(ult.rfind(b" "), ult.rfind(b"\t"), ult.rfind(b"\r"))
+                toks = ult[:k].split() if k >= 0 else None
+                if toks:
+                    valores[linha].extend(map(int, toks))
+                    em_linha = True
+                resto = ult[k + 1:]
+
+    capacidade = valores[0][0]
+    beneficios, custos = valores[1], valores[2]
+    if len(beneficios) != len(custos):
+        raise ValueError("Quantidade de benefícios != quantidade de custos")
+    return capacidade, beneficios, custos
+
+
+def resolver_grande(capacidade, beneficios, custos, janela=500):
+    #Retorna sol (bytearray, 1 byte por item), beneficio, custo
+    n = len(beneficios)
+    inf = float("inf")
+    ordem = array("i", sorted(range(n), reverse=True,
+                              key=lambda i: beneficios[i] / custos[i] if custos[i] else inf))
+
+    # quebra: maior prefixo (em densidade decrescente) que cabe
+    acum = array("q", accumulate(map(custos.__getitem__, ordem)))
+    s = bisect_right(acum, capacidade)
+
+    # guloso: prefixo + completa com o que ainda couber depois da quebra
+    gulosa = bytearray(n)
+    for i in ordem[:s]:
+        gulosa[i] = 1
+    folga = capacidade - (acum[s - 1] if s else 0)
+    for i in ordem[s:]:
+        if custos[i] <= folga:
+            gulosa[i] = 1
+            folga -= custos[i]
+    bg, cg = avalia(gulosa, beneficios, custos)
+
+    # melhoria: exato na janela em volta da quebra, antes dela tudo fixo em 1
+    lo = max(0, s - janela)
+    hi = min(n, s + janela)
+    sol = bytearray(n)
+    for i in ordem[:lo]:
+        sol[i] = 1
+    folga = capacidade - (acum[lo - 1] if lo else 0)
+    nucleo = ordem[lo:hi]
+    sub, _, sc, _ = resolver_exato(folga, [beneficios[i] for i in nucleo], [custos[i] for i in nucleo],
+                                   tempo_limite_s=10.0)
+    for k, i in enumerate(nucleo):
+        if sub[k]:
+            sol[i] = 1
+    folga -= sc
+    for i in ordem[hi:]:
+        if custos[i] <= folga:
+            sol[i] = 1
+            folga -= custos[i]
+    b, c = avalia(sol, beneficios, custos)
+
+    if bg > b:
+        return gulosa, bg, cg
+    return sol, b, c
+
+
+def salvar_saida(caminho_saida, sol, melhor_benef, melhor_custo, capacidade, otimo=None):
     itens = [str(i + 1) for i, bit in enumerate(sol) if bit == 1]  # 1-indexado
 
     with open(caminho_saida, "w", encoding="utf-8") as f:
@@ -132,6 +894,8 @@ def salvar_saida(caminho_saida, sol, melhor_benef, melhor_custo, capacidade):
         f.write(f"Benefício total: {melhor_benef}\n")
         f.write(f"Custo total: {melhor_custo}\n")
         f.write(f"Capacidade: {capacidade}\n")
+        if otimo is not None:
+            f.write(f"Ótimo provado: {'sim' if otimo else 'não'}\n")
 
 
 if __name__ == "__main__":
@@ -141,19 +905,42 @@ if __name__ == "__main__":
     nome_arquivo = "Mochila1000.txt"  
 
     caminho_entrada = os.path.join(PASTA_ENTRADAS, nome_arquivo)
-    capacidade, beneficios, custos = ler_instancia(caminho_entrada)
-
-    sol, b, c = busca_local(
-        capacidade, beneficios, custos,
-        max_iter=200000,
-        reinicios=30
-    )
+    if MODO == "grande":
+        capacidade, beneficios, custos = ler_instancia_grande(caminho_entrada)
+    else:
+        capacidade, beneficios, custos = ler_instancia(caminho_entrada)
+
+    inst = capacidade, beneficios, custos
+    if REDUZIR:
+        *inst, reducao = reduzir_instancia(capacidade, beneficios, custos)
+        print(f"Redução: {len(reducao['fixos_1'])} fixos em 1, {len(reducao['fixos_0'])} fixos em 0, "
+              f"núcleo com {len(reducao['nucleo'])} de {reducao['n']} itens")
+
+    otimo = None
+    if MODO == "exato":
+        sol, b, c, otimo = resolver_exato(*inst)
+    elif MODO == "vizinhanca":
+        sol, b, c = busca_vizinhanca(*inst, reinicios=30)
+    elif MODO == "grande":
+        sol, b, c = resolver_grande(*inst)
+    else:
+        sol, b, c = busca_local(
+            *inst,
+            max_iter=200000,
+            reinicios=30
+        )
+
+    if REDUZIR:
+        sol = expandir_solucao(sol, reducao)
+        b, c = avalia(sol, beneficios, custos)
 
     nome_base = nome_arquivo.replace(".txt", "")
     caminho_saida = os.path.join(PASTA_SAIDAS, f"1_mochila_{nome_base}_saida.txt")
 
-    salvar_saida(caminho_saida, sol, b, c, capacidade)
+    salvar_saida(caminho_saida, sol, b, c, capacidade, otimo)
 
     print(f"[OK] {nome_arquivo}")
     print(f"Benefício = {b} | Custo = {c} | Capacidade = {capacidade}")
+    if otimo is not None:
+        print(f"Ótimo provado: {'sim' if otimo else 'não'}")
     print(f"Saída: {caminho_saida}")
@@ -1,7 +1,18 @@
+import mmap
+import multiprocessing as mp
 import os
 import random
+import struct
+import sys
+import threading
 import time
+import traceback
+from array import array
+from bisect import bisect_left
 from collections import deque
+from itertools import compress
+from heapq import heappop, heappush, nsmallest
+from multiprocessing import shared_memory
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PASTA_ENTRADAS = os.path.join(BASE_DIR, "..", "entradas")
@@ -15,6 +26,36 @@ TIME_LIMIT_S = 20.0
 # tentativas de reinicio dentro do tempo
 MAX_RESTARTS = 10
 
+# busca local iterada: constroi uma vez e gasta o resto do tempo em perturbacao
+# (double-bridge / inversao com arestas existentes) + descida so na regiao mexida
+# False = reinicios completos (construir + melhorar) ate MAX_RESTARTS
+ILS = True
+
+# processos do multi-start paralelo (1 = solve_tsp sequencial)
+# cada processo roda ILS com a semente SEMENTE + k; a matriz fica em memoria
+# compartilhada e a cada KICKS_RODADA kicks todos adotam o melhor tour
+PROCESSOS = 1
+SEMENTE = 0
+KICKS_RODADA = 500
+# quanto alem do prazo um processo espera os outros na barreira (e o pai no join)
+# antes de desistir deles
+FOLGA_PARALELO_S = 5.0
+
+# para quando (custo - limite inferior) / limite inferior <= GAP_ALVO
+# o limite (1-arvore de Held-Karp) usa no maximo LB_FRACAO do tempo total
+# GAP_ALVO = None desliga o limite (todo o tempo vai para a busca)
+GAP_ALVO = 0.01
+LB_FRACAO = 0.25
+
+# le a matriz do cache binario (gerado na primeira leitura do .txt)
+USAR_CACHE = True
+
+# "lista" (listas de int), "compacta" (array int32 plano), "triangular" (int32,
+# so a metade de cima) ou "esparsa" (CSR, memoria proporcional ao numero de arestas)
+# o cache (USAR_CACHE) so vale para "lista" e "compacta" (mesmo formato n*n int32,
+# mapeado); "triangular" e "esparsa" sempre leem o .txt no proprio formato
+MATRIZ = "lista"
+
 
 
 
@@ -32,14 +73,246 @@ def ler_instancia(caminho):
     return n, mat
 
 
+# Matriz compacta
+# um array('i') plano (4 bytes por entrada em vez de ~36 da lista de listas)
+# "compacta": n*n, cada mat[a] e um memoryview da linha -> mat[a][b] sem custo extra
+# "triangular": so b >= a (metade da memoria), mat[a][b] passa por _LinhaTriangular
+
+class _LinhaTriangular:
+    __slots__ = ("dados", "inicio", "a", "n")
+
+    def __init__(self, dados, inicio, a, n):
+        self.dados = dados
+        self.inicio = inicio  # inicio[i] = posicao de (i, i) no array
+        self.a = a
+        self.n = n
+
+    def __getitem__(self, b):
+        a = self.a
+        if b >= a:
+            if b >= self.n:
+                raise IndexError(b)
+            return self.dados[self.inicio[a] + b - a]
+        return self.dados[self.inicio[b] + a - b]
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return map(self.__getitem__, range(self.n))
+
+
+def _matriz_de_linhas(n, linhas, triangular=False):
+    #linhas: iteravel com as n linhas (sequencias de int) da matriz
+    dados = array("i")
+    for i, row in enumerate(linhas):
+        if len(row) != n:
+            raise ValueError("Linha da matriz com tamanho incorreto.")
+        dados.extend(row[i:] if triangular else row)
+
+    if triangular:
+        inicio = [0] * n
+        for i in range(1, n):
+            inicio[i] = inicio[i - 1] + (n - i + 1)
+        return [_LinhaTriangular(dados, inicio, a, n) for a in range(n)]
+
+    vista = memoryview(dados)
+    return [vista[i * n:(i + 1) * n] for i in range(n)]
+
+
+def compactar_matriz(n, mat, triangular=False):
+    return _matriz_de_linhas(n, mat, triangular)
+
+
+def ler_instancia_compacta(caminho, triangular=False):
+    #le linha a linha direto para o array (sem lista de listas intermediaria)
+    with open(caminho, "r", encoding="utf-8") as f:
+        linhas = (l for l in f if l.strip())
+        n = int(next(linhas))
+        rows = (array("i", map(int, next(linhas).split())) for _ in range(n))
+        mat = _matriz_de_linhas(n, rows, triangular)
+    return n, mat
+
+
+# Grafo esparso (CSR)
+# vizinhos de v em viz[ini[v]:ini[v+1]] (ordenados) com pesos alinhados
+# mat[a][b] continua valendo (busca binaria na linha de a, 0 se a aresta nao existe),
+# entao check_necessario, construir_tour, melhorias e custo_tour rodam sem mudanca
+
+class _LinhaCSR:
+    __slots__ = ("viz", "pesos", "lo", "hi", "n")
+
+    def __init__(self, viz, pesos, lo, hi, n):
+        self.viz = viz
+        self.pesos = pesos
+        self.lo = lo
+        self.hi = hi
+        self.n = n
+
+    def __getitem__(self, b):
+        k = bisect_left(self.viz, b, self.lo, self.hi)
+        if k < self.hi and self.viz[k] == b:
+            return self.pesos[k]
+        if not 0 <= b < self.n:
+            raise IndexError(b)
+        return 0
+
+    def __len__(self):
+        return self.n
+
+    def __iter__(self):
+        return map(self.__getitem__, range(self.n))
+
+
+class GrafoCSR(list):
+    #lista de linhas (mat[a] e acesso direto de lista) + os arrays CSR
+
+    def __init__(self, n, ini, viz, pesos):
+        super().__init__(_LinhaCSR(viz, pesos, ini[v], ini[v + 1], n) for v in range(n))
+        self.n = n
+        self.ini = ini
+        self.viz = viz
+        self.pesos = pesos
+
+    def vizinhos(self, v):
+        return self.viz[self.ini[v]:self.ini[v + 1]]
+
+    def num_arestas(self):
+        return len(self.viz) // 2
+
+
+def grafo_csr_de_arestas(n, arestas):
+    #arestas: (a, b, w) com w > 0, cada aresta uma vez (grafo nao direcionado)
+    grau = [0] * (n + 1)
+    lista = []
+    for a, b, w in arestas:
+        if a != b and w > 0:
+            lista.append((a, b, w))
+            grau[a] += 1
+            grau[b] += 1
+
+    ini = array("q", [0]) * (n + 1)
+    for v in range(n):
+        ini[v + 1] = ini[v] + grau[v]
+    viz = array("i", [0]) * ini[n]
+    pesos = array("i", [0]) * ini[n]
+    livre = array("q", ini[:n])
+    for a, b, w in lista:
+        viz[livre[a]] = b
+        pesos[livre[a]] = w
+        livre[a] += 1
+        viz[livre[b]] = a
+        pesos[livre[b]] = w
+        livre[b] += 1
+
+    # ordena cada linha por vizinho (para a busca binaria)
+    for v in range(n):
+        lo, hi = ini[v], ini[v + 1]
+        par = sorted(zip(viz[lo:hi], pesos[lo:hi]))
+        viz[lo:hi] = array("i", (b for b, _ in par))
+        pesos[lo:hi] = array("i", (w for _, w in par))
+    return GrafoCSR(n, ini, viz, pesos)
+
+
+def ler_instancia_esparsa(caminho):
+    #mesmo formato de entrada (matriz), mas so as entradas > 0 sao guardadas
+    ini = array("q", [0])
+    viz = array("i")
+    pesos = array("i")
+    with open(caminho, "r", encoding="utf-8") as f:
+        linhas = (l for l in f if l.strip())
+        n = int(next(linhas))
+        for i in range(n):
+            row = next(linhas).split()
+            if len(row) != n:
+                raise ValueError("Linha da matriz com tamanho incorreto.")
+            for j, x in enumerate(row):
+                if x != "0" and j != i:
+                    w = int(x)
+                    if w > 0:
+                        viz.append(j)
+                        pesos.append(w)
+            ini.append(len(viz))
+    return n, GrafoCSR(n, ini, viz, pesos)
+
+
+# Cache binario da matriz
+# cabecalho (magic, versao, n, tamanho e mtime do .txt) + n*n int32 na ordem da maquina
+# fica do lado do .txt; se o .txt mudar o cache e refeito. A leitura e um mmap sem
+# parsing: cada linha de mat e um memoryview (fatia do mapa), entao mat[a][b] funciona
+
+CACHE_MAGIC = b"TSPM"
+CACHE_VERSAO = 1
+CACHE_CABECALHO = struct.Struct("<4sIIIqq")  # 32 bytes
+
+
+def caminho_cache(caminho):
+    return os.path.splitext(caminho)[0] + ".matbin"
+
+
+def gerar_cache(caminho, destino):
+    #converte o .txt linha a linha (sem guardar a matriz inteira em listas)
+    st = os.stat(caminho)
+    tmp = destino + ".tmp"
+    with open(caminho, "r", encoding="utf-8") as f, open(tmp, "wb") as out:
+        linhas = (l for l in f if l.strip())
+        n = int(next(linhas))
+        out.write(CACHE_CABECALHO.pack(CACHE_MAGIC, CACHE_VERSAO, n, 0, st.st_size, st.st_mtime_ns))
+        for _ in range(n):
+            row = array("i", map(int, next(linhas).split()))
+            if len(row) != n:
+                raise ValueError("Linha da matriz com tamanho incorreto.")
+            row.tofile(out)
+    os.replace(tmp, destino)
+
+
+def abrir_cache(destino, st=None):
+    #retorna (n, mat) mapeado, ou None se o cache nao bate com o .txt
+    with open(destino, "rb") as f:
+        cab = f.read(CACHE_CABECALHO.size)
+        if len(cab) < CACHE_CABECALHO.size:
+            return None
+        magic, versao, n, _, tam, mtime = CACHE_CABECALHO.unpack(cab)
+        if magic != CACHE_MAGIC or versao != CACHE_VERSAO:
+            return None
+        if st is not None and (tam != st.st_size or mtime != st.st_mtime_ns):
+            return None
+        if os.fstat(f.fileno()).st_size != CACHE_CABECALHO.size + 4 * n * n:
+            return None
+        if n == 0:
+            return 0, []
+        mapa = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    dados = memoryview(mapa)[CACHE_CABECALHO.size:].cast("i")
+    mat = [dados[i * n:(i + 1) * n] for i in range(n)]
+    return n, mat
+
+
+def ler_instancia_cache(caminho):
+    #mesmo retorno de ler_instancia, mas via cache binario mapeado em memoria
+    destino = caminho_cache(caminho)
+    st = os.stat(caminho)
+    if os.path.exists(destino):
+        res = abrir_cache(destino, st)
+        if res is not None:
+            return res
+    gerar_cache(caminho, destino)
+    return abrir_cache(destino, st)
+
+
 def build_adj(n, mat):
     #Lista de adjacencia apenas arestas com peso > 0
-    adj = [[] for _ in range(n)]
+    #cada linha e um array('i') (4 bytes por aresta; lista de int seria ~36)
+    if isinstance(mat, GrafoCSR):
+        return [mat.vizinhos(v) for v in range(n)]
+    adj = []
+    positivo = (0).__lt__
     for i in range(n):
         row = mat[i]
-        for j, w in enumerate(row):
-            if i != j and w > 0:
-                adj[i].append(j)
+        a = array("i", compress(range(n), map(positivo, row)))
+        if row[i] > 0:
+            a.remove(i)
+        adj.append(a)
     return adj
 
 
@@ -68,6 +341,128 @@ def check_necessario(n, adj):
     return low_deg, connected
 
 
+def verificar_estrutura(n, adj):
+    #pre-checagem linear (O(n + m)) que prova inviabilidade sem busca
+    #1) arestas forcadas: vertice com grau 2 usa as duas arestas; vertice com 2 arestas
+    #   forcadas perde as outras (o que pode criar novos graus 2) -> propaga.
+    #   conflito: 3 arestas forcadas no mesmo vertice, grau < 2, ciclo forcado curto
+    #2) Tarjan no grafo que sobrou: ciclo Hamiltoniano exige grafo 2-conexo, entao
+    #   ponte ou vertice de articulacao ja provam que nao existe
+    #retorna (motivo ou None, fixas, adj_reduzida); fixas[v] = vizinhos forcados de v
+    #adj nao e copiada: so os vertices que perdem arestas guardam o que foi cortado,
+    #e sem cortes adj_reduzida e a propria adj
+    grau = [len(a) for a in adj]
+    cortadas = {}  # v -> vizinhos de v cuja aresta foi cortada
+    fixas = [[] for _ in range(n)]
+
+    def vivos(v):
+        c = cortadas.get(v)
+        return [w for w in adj[v] if w not in c] if c else adj[v]
+
+    def cortar(v, w):
+        for a, b in ((v, w), (w, v)):
+            cortadas.setdefault(a, set()).add(b)
+            grau[a] -= 1
+
+    # union-find das arestas forcadas (ciclo fechando antes de cobrir tudo)
+    pai = list(range(n))
+    tam = [1] * n
+
+    def raiz(v):
+        while pai[v] != v:
+            pai[v] = pai[pai[v]]
+            v = pai[v]
+        return v
+
+    fila = deque(v for v in range(n) if grau[v] <= 2)
+
+    def forcar(u, v):
+        if v in fixas[u]:
+            return None
+        fixas[u].append(v)
+        fixas[v].append(u)
+        for x in (u, v):
+            if len(fixas[x]) > 2:
+                return f"vértice {x} com 3 arestas forçadas (vizinhos de grau 2: {fixas[x]})"
+        ru, rv = raiz(u), raiz(v)
+        if ru == rv:
+            if tam[ru] < n:
+                return f"arestas forçadas fecham um ciclo com {tam[ru]} de {n} vértices (passando por {u})"
+        else:
+            if tam[ru] < tam[rv]:
+                ru, rv = rv, ru
+            pai[rv] = ru
+            tam[ru] += tam[rv]
+        fila.append(u)
+        fila.append(v)
+        return None
+
+    while fila:
+        v = fila.popleft()
+        if grau[v] < 2:
+            return f"vértice {v} fica com grau < 2 depois de propagar as arestas forçadas", fixas, None
+        if len(fixas[v]) == 2 and grau[v] > 2:
+            for w in vivos(v):
+                if w not in fixas[v]:
+                    cortar(v, w)
+                    fila.append(w)
+        if grau[v] == 2:
+            for w in vivos(v):
+                motivo = forcar(v, w)
+                if motivo:
+                    return motivo, fixas, None
+
+    adj_red = adj
+    if cortadas:
+        adj_red = list(adj)
+        for v in cortadas:
+            adj_red[v] = array("i", vivos(v))
+
+    # Tarjan iterativo (pontes e articulacoes) a partir do vertice 0
+    if n < 3:
+        return None, fixas, adj_red
+    disc = [-1] * n
+    low = [0] * n
+    separa = [0] * n  # filhos c com low[c] >= disc[v]
+    disc[0] = low[0] = 0
+    tempo = 1
+    pilha = [(0, -1, iter(adj_red[0]))]
+    while pilha:
+        v, p, it = pilha[-1]
+        avancou = False
+        for w in it:
+            if w == p:
+                continue
+            if disc[w] < 0:
+                disc[w] = low[w] = tempo
+                tempo += 1
+                pilha.append((w, v, iter(adj_red[w])))
+                avancou = True
+                break
+            if disc[w] < low[v]:
+                low[v] = disc[w]
+        if avancou:
+            continue
+        pilha.pop()
+        if p >= 0:
+            if low[v] < low[p]:
+                low[p] = low[v]
+            if low[v] > disc[p]:
+                return f"ponte {p}-{v} (aresta cuja remoção desconecta o grafo)", fixas, None
+            if low[v] >= disc[p]:
+                separa[p] += 1
+
+    if tempo < n:
+        return "grafo desconexo depois de remover arestas que não podem ser usadas", fixas, None
+    if separa[0] >= 2:
+        return f"vértice de articulação 0 (remoção deixa {separa[0]} componentes)", fixas, None
+    for v in range(1, n):
+        if separa[v] > 0:
+            return f"vértice de articulação {v} (remoção deixa {separa[v] + 1} componentes)", fixas, None
+
+    return None, fixas, adj_red
+
+
 def aresta(mat, a, b):
     return mat[a][b] > 0
 
@@ -85,12 +480,15 @@ def custo_tour(tour, mat):
     return total
 
 
-def salvar_saida_ok(caminho, tour, custo):
+def salvar_saida_ok(caminho, tour, custo, limite=None):
     with open(caminho, "w", encoding="utf-8") as f:
         f.write("Rota encontrada (1-indexado):\n")
         tour1 = [v + 1 for v in tour] + [tour[0] + 1]
         f.write(" -> ".join(map(str, tour1)) + "\n\n")
         f.write(f"Custo total: {custo}\n")
+        if limite:
+            f.write(f"Limite inferior (1-árvore): {limite}\n")
+            f.write(f"Gap: {100.0 * (custo - limite) / limite:.2f}%\n")
 
 
 def salvar_saida_erro(caminho, msg):
@@ -120,124 +518,136 @@ def encontrar_ciclo_inicial(n, mat, adj, tentativas=20000):
     return None
 
 
-def inserir_vertice(tour, x, mat, amostras=80):
-   
-   # Insere x em alguma aresta (a->b) do tour
+def inserir_vertice(x, succ, pred, mat, adj, fixas=None):
+
+   # Insere x em alguma aresta (a->b) do tour (lista ligada succ/pred)
    # substitui (a->b) por (a->x) e (x->b)
-   # Escolhe posição de menor delta
+   # so olha as arestas do tour que saem de vizinhos de x -> O(grau de x)
+   # Escolhe a de menor delta; insercao O(1); nao quebra aresta fixa (fixas[a])
    # Retorna True se inseriu
 
-    m = len(tour)
-    best_pos = None
+    mx = mat[x]
+    best_a = None
     best_delta = None
 
-    # amostra posicoes (pra ser rapido)
-    tries = min(amostras, m)
-    for _ in range(tries):
-        i = random.randrange(m)
-        a = tour[i]
-        b = tour[(i + 1) % m]
-        if aresta(mat, a, x) and aresta(mat, x, b):
-            delta = mat[a][x] + mat[x][b] - mat[a][b]
+    for a in adj[x]:
+        b = succ[a]
+        if b < 0:
+            continue  # a fora do tour
+        if fixas is not None and b in fixas[a]:
+            continue
+        wxb = mx[b]
+        if wxb > 0:
+            delta = mx[a] + wxb - mat[a][b]
             if best_delta is None or delta < best_delta:
                 best_delta = delta
-                best_pos = i + 1
-
-    # = varre tudo se n achou em amostra
-    if best_pos is None:
-        for i in range(m):
-            a = tour[i]
-            b = tour[(i + 1) % m]
-            if aresta(mat, a, x) and aresta(mat, x, b):
-                delta = mat[a][x] + mat[x][b] - mat[a][b]
-                if best_delta is None or delta < best_delta:
-                    best_delta = delta
-                    best_pos = i + 1
-
-    if best_pos is None:
+                best_a = a
+
+    if best_a is None:
         return False
 
-    tour.insert(best_pos, x)
+    b = succ[best_a]
+    succ[best_a] = x
+    pred[x] = best_a
+    succ[x] = b
+    pred[b] = x
     return True
 
 
-def kick_2opt_valido(tour, mat, tentativas=400):
-   
-    # tenta aplicar um 2-opt que mantenha validade.
-    
-    n = len(tour)
+def kick_2opt_valido(succ, pred, no_tour, mat, tentativas=400, fixas=None):
+
+    # tenta aplicar um 2-opt que mantenha validade (na lista ligada)
+    # no_tour: vertices ja no tour (sorteio O(1))
+
     for _ in range(tentativas):
-        i = random.randint(0, n - 1)
-        k = random.randint(0, n - 1)
-        if i == k:
+        a = random.choice(no_tour)
+        c = random.choice(no_tour)
+        b = succ[a]
+        d = succ[c]
+        if a == c or b == c or d == a:
             continue
-        if i > k:
-            i, k = k, i
-        if k - i < 2:
+        if fixas is not None and (b in fixas[a] or d in fixas[c]):
             continue
 
-        a = tour[(i - 1) % n]
-        b = tour[i]
-        c = tour[k]
-        d = tour[(k + 1) % n]
-
         # novas arestas precisam existir
         if not aresta(mat, a, c):
             continue
         if not aresta(mat, b, d):
             continue
 
-        # aplicar
-        tour[i:k+1] = reversed(tour[i:k+1])
+        # aplicar: inverte o caminho b..c e religa a->c, b->d
+        v = b
+        while True:
+            prox = succ[v]
+            succ[v], pred[v] = pred[v], succ[v]
+            if v == c:
+                break
+            v = prox
+        succ[a] = c
+        pred[c] = a
+        succ[b] = d
+        pred[d] = b
         return True
     return False
 
 
-def construir_tour(n, mat, adj, tempo_limite_s):
+def construir_tour(n, mat, adj, tempo_limite_s, fixas=None):
   
     #constroe tour valido inserindo todos os vertices em um ciclo
+    #tour como lista ligada (succ/pred): cada insercao custa O(grau)
     #Se travar, tenta kicks e  se ainda travar, falha para reiniciar
    
     t0 = time.time()
 
-    tour = encontrar_ciclo_inicial(n, mat, adj)
-    if tour is None:
+    ciclo = encontrar_ciclo_inicial(n, mat, adj)
+    if ciclo is None:
         return None
 
-    in_tour = [False] * n
-    for v in tour:
-        in_tour[v] = True
+    succ = [-1] * n
+    pred = [-1] * n
+    for i, v in enumerate(ciclo):
+        w = ciclo[(i + 1) % len(ciclo)]
+        succ[v] = w
+        pred[w] = v
+    no_tour = list(ciclo)
 
-    restantes = [v for v in range(n) if not in_tour[v]]
+    # embaralha como lista (indexar deque e O(n)) e so depois vira deque
+    restantes = [v for v in range(n) if succ[v] < 0]
     random.shuffle(restantes)
+    restantes = deque(restantes)
 
     falhas = 0
-    idx = 0
 
     # controle de travamento
-    while idx < len(restantes):
+    while restantes:
         if time.time() - t0 > tempo_limite_s:
             return None
 
-        x = restantes[idx]
-        ok = inserir_vertice(tour, x, mat, amostras=100)
+        x = restantes[0]
+        ok = inserir_vertice(x, succ, pred, mat, adj, fixas)
 
         if ok:
-            in_tour[x] = True
-            idx += 1
+            no_tour.append(x)
+            restantes.popleft()
             falhas = 0
         else:
             falhas += 1
             # tenta kick para mudar pares consecutivos
             if falhas % 10 == 0:
-                kick_2opt_valido(tour, mat, tentativas=800)
+                kick_2opt_valido(succ, pred, no_tour, mat, tentativas=800, fixas=fixas)
 
             # se acumulou muitas falhas seguidas desiste e reinicia
             if falhas > max(40, n // 20):
                 return None
 
             # joga esse vértice pro fim e tenta outro
-            restantes.append(restantes.pop(idx))
+            restantes.rotate(-1)
+
+    tour = [ciclo[0]]
+    v = succ[ciclo[0]]
+    while v != ciclo[0]:
+        tour.append(v)
+        v = succ[v]
 
     # validação final
     if custo_tour(tour, mat) is None:
@@ -296,9 +706,560 @@ def melhorar_2opt_valido(tour, mat, time_budget_s=6.0):
 
 
 
+# Construcao por rotacao-extensao (Posa)
+# caminho que cresce pela ponta; sem vizinho livre na ponta, gira o caminho
+# (u = vizinho da ponta dentro do caminho, inverte o trecho depois de u) para trocar
+# de ponta; caminho fechando ciclo antes de cobrir tudo -> abre o ciclo num vertice
+# que tem vizinho de fora. Bem mais confiavel que a insercao em grafos esparsos
+# cada rotacao custa O(n): depois de max_rotacoes (padrao n) rotacoes seguidas sem
+# estender, recomeca de outro vertice em vez de gastar o prazo todo num caminho so;
+# com chance POSA_TROCA_PONTA a rotacao e trocada por inverter o caminho (gira a
+# outra ponta), o que destrava bem mais em grafos de grau 3-4
+
+POSA_TROCA_PONTA = 0.05
+
+
+def construir_posa(n, mat, adj, tempo_limite_s, max_rotacoes=None, fixas=None):
+    #fixas[v]: vizinhos forcados de v; rotacoes e aberturas nao quebram essas arestas
+    t0 = time.time()
+    if n < 3:
+        return None
+    if max_rotacoes is None:
+        max_rotacoes = n
+
+    while time.time() - t0 <= tempo_limite_s:
+        P = _posa_tentativa(n, mat, adj, t0, tempo_limite_s, max_rotacoes, fixas)
+        if P is not None:
+            return P
+    return None
+
+
+def _posa_tentativa(n, mat, adj, t0, tempo_limite_s, max_rotacoes, fixas):
+    #um caminho a partir de um vertice aleatorio; None se travou ou estourou o prazo
+    # restantes[v] = vizinhos de v ainda fora do caminho (Warnsdorff)
+    restantes = [len(adj[v]) for v in range(n)]
+    pos = [-1] * n
+    P = []
+
+    def entra(v):
+        pos[v] = len(P)
+        P.append(v)
+        for u in adj[v]:
+            restantes[u] -= 1
+
+    entra(random.randrange(n))
+    rotacoes = 0  # seguidas, sem estender
+
+    while True:
+        if rotacoes % 64 == 0 and time.time() - t0 > tempo_limite_s:
+            return None
+
+        e = P[-1]
+        me = mat[e]
+
+        # extensao: vizinho livre; os quase sem saida primeiro, senao o mais barato
+        melhor = None
+        chave = None
+        for u in adj[e]:
+            if pos[u] < 0:
+                k = (min(restantes[u], 2), me[u])
+                if chave is None or k < chave:
+                    melhor, chave = u, k
+        if melhor is not None:
+            entra(melhor)
+            rotacoes = 0
+            continue
+
+        fecha = me[P[0]] > 0
+        if fecha and len(P) == n:
+            return P
+
+        rotacoes += 1
+        if rotacoes > max_rotacoes:
+            return None
+
+        if fecha:
+            # ciclo sobre P: abre num vertice com vizinho fora e estende por ele
+            for i, v in enumerate(P):
+                if restantes[v] > 0 and (fixas is None or P[(i + 1) % len(P)] not in fixas[v]):
+                    P[:] = P[i + 1:] + P[:i + 1]
+                    for k, x in enumerate(P):
+                        pos[x] = k
+                    break
+            if P[-1] != e:
+                continue
+
+        # rotacao: u = P[i] vizinho da ponta, novo caminho P[0..i] + reverso(P[i+1..])
+        opcoes = [u for u in adj[e] if pos[u] < len(P) - 2
+                  and (fixas is None or P[pos[u] + 1] not in fixas[u])]
+        if not opcoes or random.random() < POSA_TROCA_PONTA:
+            P.reverse()
+            for k, x in enumerate(P):
+                pos[x] = k
+            continue
+        # prefere a rotacao cuja ponta nova ja estende (ou fecha, se o caminho e completo)
+        if len(P) == n:
+            m0 = mat[P[0]]
+            boas = [u for u in opcoes if m0[P[pos[u] + 1]] > 0]
+        else:
+            boas = [u for u in opcoes if restantes[P[pos[u] + 1]] > 0]
+        i = pos[random.choice(boas or opcoes)]
+        P[i + 1:] = P[:i:-1]
+        for k in range(i + 1, len(P)):
+            pos[P[k]] = k
+
+
+
+#  2-opt com listas candidatas + don't-look bits
+# so testa (a, c) com c entre as k arestas mais baratas de a, e so reprocessa
+# cidades cujas arestas mudaram -> roda ate o otimo local de verdade
+
+# quantas arestas baratas por cidade entram na lista candidata
+K_CANDIDATOS = 16
+
+
+def listas_candidatas(n, mat, adj, k=K_CANDIDATOS):
+    #as k arestas existentes mais baratas de cada cidade, em ordem crescente de peso
+    return [array("i", sorted(adj[v], key=mat[v].__getitem__)[:k]) for v in range(n)]
+
+
+def posicoes(tour):
+    pos = [0] * len(tour)
+    for i, v in enumerate(tour):
+        pos[v] = i
+    return pos
+
+
+def reverter_trecho(tour, pos, i, j):
+    #inverte o trecho circular tour[i..j] (posicoes), atualizando pos
+    #se o trecho passar da metade inverte o complemento (mesmo ciclo, sentido oposto)
+    n = len(tour)
+    L = (j - i) % n + 1
+    if 2 * L > n:
+        i, j = (j + 1) % n, (i - 1) % n
+        L = n - L
+    for _ in range(L // 2):
+        a = tour[i]
+        b = tour[j]
+        tour[i] = b
+        pos[b] = i
+        tour[j] = a
+        pos[a] = j
+        i += 1
+        if i == n:
+            i = 0
+        j -= 1
+        if j < 0:
+            j = n - 1
+
+
+def trocar_2opt(tour, pos, a, b, c, d):
+    #2-opt pelas cidades: tira (a,b) e (c,d), poe (a,c) e (b,d)
+    #vale nos dois sentidos do array desde que b=succ(a) <=> d=succ(c)
+    n = len(tour)
+    if tour[(pos[a] + 1) % n] == b:
+        reverter_trecho(tour, pos, pos[b], pos[c])
+    else:
+        reverter_trecho(tour, pos, pos[a], pos[d])
+
+
+def _mov_2opt(a, tour, pos, mat, cand):
+    #primeiro 2-opt que melhora saindo de a; retorna as cidades afetadas ou None
+    n = len(tour)
+    ma = mat[a]
+    i = pos[a]
+    for sentido in (1, -1):
+        b = tour[(i + sentido) % n]
+        wab = ma[b]
+        for c in cand[a]:
+            g1 = wab - ma[c]
+            if g1 <= 0:
+                break  # candidatos em ordem crescente, os proximos sao piores
+            d = tour[(pos[c] + sentido) % n]
+            if c == b or d == a:
+                continue
+            wbd = mat[b][d]
+            if wbd == 0:
+                continue  # aresta nova precisa existir
+            if g1 + mat[c][d] - wbd > 0:
+                trocar_2opt(tour, pos, a, b, c, d)
+                return (a, b, c, d)
+    return None
+
+
+# tamanho maximo do trecho movido pelo or-opt
+OR_OPT_MAX = 3
+
+
+def _mov_oropt(a, tour, pos, mat, cand):
+    #or-opt: tira o trecho S = a..sL (1 a 3 cidades, nos dois sentidos) e reinsere
+    #entre c e d, com c na lista candidata de a (aresta c-a) e aresta sL-d existindo
+    #no sentido do trecho: p S nx ... ; feito como 2 ou 3 trocas 2-opt
+    n = len(tour)
+    if n < OR_OPT_MAX + 5:
+        return None
+    ma = mat[a]
+    i = pos[a]
+    for sentido in (1, -1):
+        p = tour[(i - sentido) % n]
+        wpa = ma[p]
+        for L in range(1, OR_OPT_MAX + 1):
+            sL = tour[(i + sentido * (L - 1)) % n]
+            nx = tour[(i + sentido * L) % n]
+            wpn = mat[p][nx]
+            if wpn == 0:
+                continue
+            ganho_tirar = wpa + mat[sL][nx] - wpn
+            trecho = {tour[(i + sentido * t) % n] for t in range(L)}
+            for c in cand[a]:
+                g1 = ganho_tirar - ma[c]
+                if g1 <= 0:
+                    break
+                if c in trecho or c == p or c == nx:
+                    continue
+                j = pos[c]
+                for d in (tour[(j + sentido) % n], tour[(j - sentido) % n]):
+                    if d in trecho or d == p or d == nx:
+                        continue
+                    wsd = mat[sL][d]
+                    if wsd == 0 or g1 + mat[c][d] - wsd <= 0:
+                        continue
+                    if d == tour[(j - sentido) % n]:
+                        # d antes de c: ... d sL..a c ...
+                        trocar_2opt(tour, pos, p, a, d, c)
+                        trocar_2opt(tour, pos, p, d, nx, sL)
+                    else:
+                        # c antes de d: ... c a..sL d ...
+                        trocar_2opt(tour, pos, p, a, c, d)
+                        trocar_2opt(tour, pos, p, c, nx, sL)
+                        trocar_2opt(tour, pos, c, sL, a, d)
+                    return (p, nx, c, d, a, sL)
+    return None
+
+
+def _descida_dlb(tour, mat, cand, movimentos, time_budget_s, ativos, varrer=True):
+    #aplica os movimentos a partir de cada cidade ativa ate nenhuma melhorar
+    #ativos: cidades com don't-look bit desligado no inicio (None = todas)
+    #varrer=False: para quando a fila esvazia (descida local, sem revarrer o tour)
+    t0 = time.time()
+    n = len(tour)
+    if n < 5:
+        return tour
+
+    pos = posicoes(tour)
+    fila = deque(tour if ativos is None else ativos)
+    na_fila = [False] * n
+    for v in fila:
+        na_fila[v] = True
+
+    passos = 0
+    melhorou = False
+    while True:
+        if not fila:
+            # inversoes mudam a orientacao relativa de arestas que nao foram tocadas,
+            # entao a fila vazia ainda nao garante otimo local: varre tudo de novo
+            if not melhorou or not varrer:
+                break
+            melhorou = False
+            fila.extend(tour)
+            for v in tour:
+                na_fila[v] = True
+
+        passos += 1
+        if passos % 256 == 0 and time.time() - t0 > time_budget_s:
+            break
+
+        a = fila.popleft()
+        na_fila[a] = False
+
+        for mov in movimentos:
+            mudou = mov(a, tour, pos, mat, cand)
+            if mudou:
+                melhorou = True
+                for v in mudou:
+                    if not na_fila[v]:
+                        na_fila[v] = True
+                        fila.append(v)
+                break
+
+    return tour
+
+
+def melhorar_2opt_candidatos(tour, mat, cand, time_budget_s=6.0, ativos=None):
+    return _descida_dlb(tour, mat, cand, (_mov_2opt,), time_budget_s, ativos)
+
+
+def melhorar_or2opt(tour, mat, cand, time_budget_s=6.0, ativos=None, varrer=True):
+    #2-opt + or-opt na mesma descida
+    return _descida_dlb(tour, mat, cand, (_mov_2opt, _mov_oropt), time_budget_s, ativos, varrer)
+
+
+
+# Perturbacao para a busca local iterada (so com arestas existentes)
+
+# tamanho maximo de cada trecho do double-bridge (segmentos curtos = perturbacao local)
+ILS_SEGMENTO = 50
+
+
+def double_bridge(tour, mat, cand, tentativas=200):
+    #A B C D -> A C B D com B e C trechos curtos e consecutivos
+    #arestas novas: (fim A, ini C), (fim C, ini B), (fim B, ini D) precisam existir
+    #ini C sai da lista candidata do fim de A (aresta garantida, funciona em grafo esparso)
+    #retorna (novo tour, cidades das pontas) ou None
+    n = len(tour)
+    if n < 8:
+        return None
+    seg = min(ILS_SEGMENTO, (n - 2) // 2)
+    pos = posicoes(tour)
+    for _ in range(tentativas):
+        i = random.randrange(n)
+        a = tour[i]
+        if not cand[a]:
+            continue
+        c1 = random.choice(cand[a])
+        L1 = (pos[c1] - i - 1) % n
+        if L1 < 1 or L1 > seg:
+            continue
+        b1 = tour[(i + 1) % n]
+        b2 = tour[(i + L1) % n]
+        m = min(seg, n - 2 - L1)
+        ini = random.randrange(m)
+        for t in range(m):
+            L2 = (ini + t) % m + 1
+            c2 = tour[(i + L1 + L2) % n]
+            d = tour[(i + L1 + L2 + 1) % n]
+            if mat[c2][b1] == 0 or mat[b2][d] == 0:
+                continue
+            # gira para A ficar no fim e monta C B D..A
+            r = tour[i + 1:] + tour[:i + 1]
+            novo = r[L1:L1 + L2] + r[:L1] + r[L1 + L2:]
+            return novo, (a, b1, b2, c1, c2, d)
+    return None
+
+
+def inversao_aleatoria(tour, mat, cand, tentativas=200):
+    #2-opt aleatorio (nao necessariamente melhora) com c na lista candidata de a
+    #usado quando o double-bridge nao acha 3 arestas validas (grafos esparsos)
+    n = len(tour)
+    pos = posicoes(tour)
+    for _ in range(tentativas):
+        a = random.choice(tour)
+        if not cand[a]:
+            continue
+        c = random.choice(cand[a])
+        sentido = random.choice((1, -1))
+        b = tour[(pos[a] + sentido) % n]
+        d = tour[(pos[c] + sentido) % n]
+        if c == b or d == a or mat[b][d] == 0:
+            continue
+        trocar_2opt(tour, pos, a, b, c, d)
+        return tour, (a, b, c, d)
+    return None
+
+
+def perturbar(tour, mat, cand):
+    #trabalha numa copia: o tour recebido (o melhor) fica intacto
+    r = double_bridge(tour, mat, cand)
+    if r is None:
+        r = inversao_aleatoria(tour[:], mat, cand)
+    return r
+
+
+def busca_local_iterada(tour, mat, cand, time_budget_s, stats=None, max_kicks=None, custo_alvo=None):
+    #perturba o melhor tour, desce so a partir das cidades mexidas (e vizinhas no tour)
+    #e aceita se nao piorar; volta ao melhor caso contrario
+    #max_kicks: para depois de tantos kicks (rodadas deterministicas do modo paralelo)
+    #custo_alvo: para ao chegar nesse custo (gap ja suficiente)
+    t0 = time.time()
+    n = len(tour)
+    best = tour
+    best_cost = custo_tour(best, mat)
+    kicks = aceitos = falhas = 0
+
+    while time.time() - t0 < time_budget_s:
+        if max_kicks is not None and kicks >= max_kicks:
+            break
+        if custo_alvo is not None and best_cost <= custo_alvo:
+            break
+        r = perturbar(best, mat, cand)
+        if r is None:
+            falhas += 1
+            if falhas > 50:
+                break  # nao acha perturbacao valida
+            continue
+        falhas = 0
+        novo, pontas = r
+        kicks += 1
+
+        pos = posicoes(novo)
+        ativos = set()
+        for v in pontas:
+            j = pos[v]
+            ativos.update((novo[(j - 1) % n], v, novo[(j + 1) % n]))
+
+        resto = time_budget_s - (time.time() - t0)
+        novo = melhorar_or2opt(novo, mat, cand, time_budget_s=resto, ativos=ativos, varrer=False)
+        c = custo_tour(novo, mat)
+        if c is not None and c <= best_cost:
+            if c < best_cost:
+                aceitos += 1
+            best = novo
+            best_cost = c
+
+    if stats is not None:
+        stats["kicks"] = stats.get("kicks", 0) + kicks
+        stats["kicks_melhoraram"] = stats.get("kicks_melhoraram", 0) + aceitos
+    return best
+
+
+
+# Limite inferior (1-arvore / Held-Karp)
+# 1-arvore = arvore geradora minima em V - {raiz} + as 2 arestas mais baratas da raiz;
+# com penalidades pi o peso vira w + pi[a] + pi[b] e L(pi) = 1-arvore - 2*sum(pi) <= otimo
+# subgradiente: pi[v] += t * (grau[v] - 2). Aresta inexistente = infinito
+# pi inteiro sobre pesos escalados por LB_ESCALA (todo pi e valido, so muda a qualidade)
+# a ascensao roda sobre as listas candidatas simetrizadas (Prim com heap, O(m log n));
+# L(pi) ali nao e limite valido (falta aresta), entao o melhor pi e avaliado uma vez
+# sobre adj inteiro no fim. Se a 1a iteracao mostra que nao cabem LB_ITER_MIN
+# iteracoes mais essa avaliacao no tempo, desiste (None) e o tempo fica para a busca;
+# se apos LB_ITER_MIN iteracoes o limite ainda esta LB_GAP_DESISTE abaixo do ub,
+# o gap alvo nao vai ser atingido: para ali e devolve o limite que ja tem
+
+LB_ESCALA = 64
+LB_ITER_MIN = 50
+LB_GAP_DESISTE = 0.25
+_LB_INF = 1 << 40
+
+
+def _viz_lb(n, cand):
+    #vizinhanca nao direcionada das listas candidatas
+    viz = [set(c) for c in cand]
+    for u in range(n):
+        for v in cand[u]:
+            viz[v].add(u)
+    return [sorted(s) for s in viz]
+
+
+def _um_arvore(n, mat, viz, pi, raiz=0):
+    #retorna (peso da 1-arvore com penalidades, grau) ou None se V - {raiz} desconexo em viz
+    na_arvore = [False] * n
+    na_arvore[raiz] = True
+    chave = [_LB_INF] * n
+    pai = [-1] * n
+    grau = [0] * n
+    total = 0
+    faltam = n - 1
+
+    s = 1 if raiz == 0 else 0
+    chave[s] = 0
+    heap = [(0, s)]
+    while heap:
+        c, u = heappop(heap)
+        if na_arvore[u]:
+            continue
+        na_arvore[u] = True
+        faltam -= 1
+        total += c
+        if pai[u] >= 0:
+            grau[u] += 1
+            grau[pai[u]] += 1
+        mu = mat[u]
+        pu = pi[u]
+        for v in viz[u]:
+            if not na_arvore[v]:
+                cv = mu[v] * LB_ESCALA + pu + pi[v]
+                if cv < chave[v]:
+                    chave[v] = cv
+                    pai[v] = u
+                    heappush(heap, (cv, v))
+    if faltam:
+        return None
+
+    # duas arestas mais baratas da raiz
+    mr = mat[raiz]
+    pr = pi[raiz]
+    menores = nsmallest(2, ((mr[v] * LB_ESCALA + pr + pi[v], v) for v in viz[raiz]))
+    if len(menores) < 2:
+        return None
+    total += menores[0][0] + menores[1][0]
+    for _, v in menores:
+        grau[v] += 1
+    grau[raiz] = 2
+    return total, grau
+
+
+def limite_inferior(n, mat, adj, cand, ub, tempo_limite_s, max_iter=1000):
+    #ascensao por subgradiente (Held-Karp); ub = custo de um tour conhecido
+    #retorna o melhor limite inteiro (teto de L(pi) / LB_ESCALA), ou None
+    t0 = time.time()
+    if n < 3:
+        return None
+    viz = _viz_lb(n, cand)
+    pi = [0] * n
+    pi_melhor = pi
+    melhor = None
+    alfa = 2.0
+    sem_melhora = 0
+    alvo = ub * LB_ESCALA
+    t1 = None
+
+    for it in range(max_iter):
+        ti = time.time()
+        if ti - t0 > tempo_limite_s:
+            break
+        r = _um_arvore(n, mat, viz, pi)
+        if r is None:
+            if viz is adj:
+                return None
+            viz = adj  # candidatas desconexas: ascensao direto no grafo todo
+            continue
+        if t1 is None:
+            t1 = time.time() - ti
+            exato = t1 * sum(map(len, adj)) / sum(map(len, viz)) if viz is not adj else 0.0
+            if LB_ITER_MIN * t1 + exato > tempo_limite_s - (ti - t0):
+                return None
+        total, grau = r
+        L = total - 2 * sum(pi)
+        if melhor is None or L > melhor:
+            melhor = L
+            pi_melhor = pi[:]
+            sem_melhora = 0
+        else:
+            sem_melhora += 1
+            if sem_melhora >= 10:
+                alfa /= 2
+                sem_melhora = 0
+
+        norma = sum((g - 2) * (g - 2) for g in grau)
+        if norma == 0 or melhor >= alvo or alfa < 1e-3:
+            break  # 1-arvore e um tour (otimo) ou limite ja encostou no ub
+        if it >= LB_ITER_MIN and alvo - melhor > LB_GAP_DESISTE * melhor:
+            break
+        t = alfa * max(alvo - L, LB_ESCALA) / norma
+        for v in range(n):
+            d = grau[v] - 2
+            if d:
+                pi[v] += int(round(t * d)) or d
+
+    if melhor is None:
+        return None
+    if viz is not adj:
+        r = _um_arvore(n, mat, adj, pi_melhor)
+        if r is None:
+            return None
+        melhor = r[0] - 2 * sum(pi_melhor)
+    return -(-melhor // LB_ESCALA)
+
+
 # Solver principal (com limite de tempo) 
 
-def solve_tsp(n, mat, time_limit_s=20.0):
+def solve_tsp(n, mat, time_limit_s=20.0, stats=None):
+    #stats (dict opcional) recebe tempo de construcao x melhoria e contagens
+    if stats is None:
+        stats = {}
+    stats.update(construcao_s=0.0, melhoria_s=0.0, construcoes=0, falhas_posa=0, falhas_construcao=0,
+                 kicks=0, kicks_melhoraram=0, limite_s=0.0, limite_inferior=None, gap=None)
+
     adj = build_adj(n, mat)
     low_deg, connected = check_necessario(n, adj)
 
@@ -308,9 +1269,19 @@ def solve_tsp(n, mat, time_limit_s=20.0):
     if not connected:
         return None, "Instância inviável (necessário): grafo desconexo."
 
+    # pontes/articulacoes e arestas forcadas; daqui pra frente so o grafo reduzido
+    # (arestas cortadas nao cabem em nenhum ciclo Hamiltoniano)
+    motivo, fixas, adj = verificar_estrutura(n, adj)
+    if motivo:
+        return None, f"Instância inviável (estrutura): {motivo}."
+
+    cand = listas_candidatas(n, mat, adj)
+
     t0 = time.time()
     best = None
     best_cost = None
+    alvo = None
+    limite_tentado = False  # limite_inferior pode devolver None: nao repetir a cada reinicio
 
     restarts = 0
     while time.time() - t0 < time_limit_s and restarts < MAX_RESTARTS:
@@ -324,11 +1295,21 @@ def solve_tsp(n, mat, time_limit_s=20.0):
         build_budget = max(1.0, remaining * 0.55)
         improve_budget = max(1.0, remaining * 0.35)
 
-        tour = construir_tour(n, mat, adj, tempo_limite_s=build_budget)
+        # Posa primeiro; se nao fechar o ciclo, insercao com o resto do orcamento
+        tc = time.time()
+        tour = construir_posa(n, mat, adj, tempo_limite_s=build_budget * 0.5, fixas=fixas)
+        if tour is None:
+            stats["falhas_posa"] += 1
+            tour = construir_tour(n, mat, adj, tempo_limite_s=build_budget - (time.time() - tc), fixas=fixas)
+        stats["construcao_s"] += time.time() - tc
         if tour is None:
+            stats["falhas_construcao"] += 1
             continue
+        stats["construcoes"] += 1
 
-        tour = melhorar_2opt_valido(tour, mat, time_budget_s=improve_budget)
+        tm = time.time()
+        tour = melhorar_or2opt(tour, mat, cand, time_budget_s=improve_budget)
+        stats["melhoria_s"] += time.time() - tm
         c = custo_tour(tour, mat)
         if c is None:
             continue
@@ -337,6 +1318,26 @@ def solve_tsp(n, mat, time_limit_s=20.0):
             best = tour[:]
             best_cost = c
 
+        # limite inferior uma vez, com o primeiro tour como ub
+        if not limite_tentado and GAP_ALVO is not None:
+            limite_tentado = True
+            tl = time.time()
+            lb = limite_inferior(n, mat, adj, cand, best_cost, LB_FRACAO * time_limit_s)
+            stats["limite_s"] = time.time() - tl
+            stats["limite_inferior"] = lb
+            if lb:
+                alvo = int(lb * (1 + GAP_ALVO))
+        if alvo is not None and best_cost <= alvo:
+            break
+
+        # ILS: o resto do tempo vai para perturbar + melhorar este tour
+        if ILS:
+            tm = time.time()
+            best = busca_local_iterada(best, mat, cand, time_limit_s - (tm - t0), stats, custo_alvo=alvo)
+            best_cost = custo_tour(best, mat)
+            stats["melhoria_s"] += time.time() - tm
+            break
+
         # se ja achou algo não precisa gastar tudo
         if (time.time() - t0) > time_limit_s * 0.85:
             break
@@ -344,18 +1345,235 @@ def solve_tsp(n, mat, time_limit_s=20.0):
     if best is None:
         return None, "Não foi possível encontrar um ciclo Hamiltoniano dentro do limite de tempo. (Pode não existir.)"
 
+    if stats["limite_inferior"]:
+        stats["gap"] = (best_cost - stats["limite_inferior"]) / stats["limite_inferior"]
     return best, None
 
 
 
+# Multi-start paralelo (memoria compartilhada)
+# a matriz vai uma vez para um bloco SharedMemory (int32, n*n) e cada processo
+# monta as linhas como memoryview do bloco (nada de pickle da matriz)
+# adjacencia (ja reduzida) e listas candidatas sao calculadas uma vez no pai e vao
+# em CSR para outro bloco: 2(n+1) inicios (int64) e depois os vizinhos (int32);
+# nos processos adj[v] e cand[v] tambem sao fatias do bloco
+# cada processo tem uma vaga [custo, tour...] (int64) num segundo bloco; no fim de
+# cada rodada (KICKS_RODADA kicks) todos escrevem sua vaga, esperam a barreira e
+# adotam o melhor (menor custo, empate -> menor indice). Com as mesmas sementes o
+# resultado e o mesmo, desde que o prazo nao corte uma rodada no meio
+
+def _vagas(buf, n, processos):
+    dados = buf.cast("q")
+    return [dados[k * (n + 1):(k + 1) * (n + 1)] for k in range(processos)]
+
+
+def _tamanho_grafo(n, m):
+    #m = total de entradas de adj + cand
+    return 16 * (n + 1) + 4 * m
+
+
+def _escrever_grafo(buf, n, adj, cand):
+    ini = buf[:16 * (n + 1)].cast("q")
+    viz = buf[16 * (n + 1):].cast("i")
+    pos = 0
+    for k, linhas in enumerate((adj, cand)):
+        for v in range(n):
+            ini[k * (n + 1) + v] = pos
+            viz[pos:pos + len(linhas[v])] = array("i", linhas[v])
+            pos += len(linhas[v])
+        ini[k * (n + 1) + n] = pos
+
+
+def _linhas_grafo(buf, n, m):
+    #retorna (adj, cand) como fatias do bloco
+    ini = buf[:16 * (n + 1)].cast("q")
+    viz = buf[16 * (n + 1):_tamanho_grafo(n, m)].cast("i")
+    adj = [viz[ini[v]:ini[v + 1]] for v in range(n)]
+    cand = [viz[ini[n + 1 + v]:ini[n + 2 + v]] for v in range(n)]
+    return adj, cand
+
+
+def _worker_paralelo(k, semente, nome_mat, nome_grafo, m, nome_vagas, n, processos, prazo,
+                     kicks_rodada, max_rodadas, barreira, continuar):
+    #se algo falhar aqui, aborta a barreira: os outros saem do wait com
+    #BrokenBarrierError, gravam a vaga e terminam (ninguem fica preso)
+    random.seed(semente)
+    shm_mat = shared_memory.SharedMemory(name=nome_mat)
+    shm_grafo = shared_memory.SharedMemory(name=nome_grafo)
+    shm_vagas = shared_memory.SharedMemory(name=nome_vagas)
+    dados = shm_mat.buf.cast("i")
+    mat = [dados[i * n:(i + 1) * n] for i in range(n)]
+    adj, cand = _linhas_grafo(shm_grafo.buf, n, m)
+    vagas = _vagas(shm_vagas.buf, n, processos)
+    minha = vagas[k]
+    tour = None
+    custo = -1
+
+    def gravar():
+        if tour is not None:
+            minha[0] = -1  # vaga invalida enquanto o tour e escrito
+            minha[1:] = array("q", tour)
+        minha[0] = custo
+
+    def esperar():
+        barreira.wait(timeout=max(0.0, prazo - time.time()) + FOLGA_PARALELO_S)
+
+    falhou = False
+    try:
+        # construcao como no solve_tsp (Posa, senao insercao), repetindo ate o prazo
+        while tour is None and time.time() < prazo:
+            resto = prazo - time.time()
+            tour = construir_posa(n, mat, adj, tempo_limite_s=resto * 0.25)
+            if tour is None:
+                tour = construir_tour(n, mat, adj, tempo_limite_s=resto * 0.25)
+        if tour is not None:
+            tour = melhorar_or2opt(tour, mat, cand, time_budget_s=max(0.0, prazo - time.time()))
+            custo = custo_tour(tour, mat)
+
+        rodada = 0
+        while True:
+            rodada += 1
+            if tour is not None:
+                tour = busca_local_iterada(tour, mat, cand, max(0.0, prazo - time.time()),
+                                           max_kicks=kicks_rodada)
+                custo = custo_tour(tour, mat)
+            gravar()
+            esperar()
+
+            # todos leem as vagas; o processo 0 decide (uma vez so) se ha outra rodada
+            melhor_k = None
+            for j in range(processos):
+                cj = vagas[j][0]
+                if cj >= 0 and (melhor_k is None or cj < vagas[melhor_k][0]):
+                    melhor_k = j
+            if melhor_k is not None and (custo < 0 or vagas[melhor_k][0] < custo):
+                tour = vagas[melhor_k][1:].tolist()
+                custo = vagas[melhor_k][0]
+            if k == 0:
+                continuar.value = time.time() < prazo and (max_rodadas is None or rodada < max_rodadas)
+            esperar()
+
+            if not continuar.value:
+                break
+        # a ultima adocao nao foi escrita: a vaga guarda o custo proprio deste processo
+    except threading.BrokenBarrierError:
+        # outro processo falhou (ou estourou a folga): fica com o que tem
+        gravar()
+    except BaseException:
+        minha[0] = -1
+        barreira.abort()
+        traceback.print_exc()
+        falhou = True
+    #fora do except o traceback (que segura views dos blocos) ja foi solto,
+    #entao as views podem ser liberadas e os blocos fechados
+    del mat, adj, cand, minha, vagas, dados
+    shm_mat.close()
+    shm_grafo.close()
+    shm_vagas.close()
+    if falhou:
+        sys.exit(1)
+
+
+def solve_tsp_paralelo(n, mat, time_limit_s=20.0, processos=PROCESSOS, semente=SEMENTE,
+                       kicks_rodada=KICKS_RODADA, max_rodadas=None):
+    #retorna (melhor tour, erro, custo final de cada processo); custo -1 = nao construiu
+    #determinismo: mesmas sementes e mesmo numero de rodadas -> mesmo resultado; com
+    #prazo apertado o numero de rodadas depende da maquina (use max_rodadas para fixar)
+    adj = build_adj(n, mat)
+    low_deg, connected = check_necessario(n, adj)
+    if low_deg:
+        return None, f"Instância inviável (necessário): vértices com grau < 2: {len(low_deg)} (ex.: {low_deg[:10]})", []
+    if not connected:
+        return None, "Instância inviável (necessário): grafo desconexo.", []
+    motivo, _, adj = verificar_estrutura(n, adj)
+    if motivo:
+        return None, f"Instância inviável (estrutura): {motivo}.", []
+    cand = listas_candidatas(n, mat, adj)
+    m = sum(map(len, adj)) + sum(map(len, cand))
+
+    prazo = time.time() + time_limit_s
+    shm_mat = shared_memory.SharedMemory(create=True, size=max(4, 4 * n * n))
+    shm_grafo = shared_memory.SharedMemory(create=True, size=_tamanho_grafo(n, m))
+    shm_vagas = shared_memory.SharedMemory(create=True, size=8 * (n + 1) * processos)
+    try:
+        dados = shm_mat.buf.cast("i")
+        for i in range(n):
+            dados[i * n:(i + 1) * n] = array("i", mat[i])
+        del dados
+        _escrever_grafo(shm_grafo.buf, n, adj, cand)
+        del adj, cand
+        vagas = _vagas(shm_vagas.buf, n, processos)
+        for v in vagas:
+            v[0] = -1  # processo que morrer antes de gravar nao conta
+        del v, vagas
+
+        barreira = mp.Barrier(processos)
+        continuar = mp.Value("b", True, lock=False)
+        procs = [mp.Process(target=_worker_paralelo,
+                            args=(k, semente + k, shm_mat.name, shm_grafo.name, m, shm_vagas.name, n,
+                                  processos, prazo, kicks_rodada, max_rodadas, barreira, continuar))
+                 for k in range(processos)]
+        for p in procs:
+            p.start()
+        limite_join = prazo + 2 * FOLGA_PARALELO_S
+        for p in procs:
+            p.join(max(0.0, limite_join - time.time()))
+        for p in procs:
+            if p.is_alive():
+                p.terminate()
+                p.join()
+
+        # vaga de processo que falhou ou foi terminado pode estar pela metade
+        vagas = _vagas(shm_vagas.buf, n, processos)
+        custos = [v[0] if p.exitcode == 0 else -1 for v, p in zip(vagas, procs)]
+        validos = [k for k in range(processos) if custos[k] >= 0]
+        best = None
+        if validos:
+            kb = min(validos, key=custos.__getitem__)
+            best = vagas[kb][1:].tolist()
+        del vagas
+    finally:
+        shm_mat.close()
+        shm_mat.unlink()
+        shm_grafo.close()
+        shm_grafo.unlink()
+        shm_vagas.close()
+        shm_vagas.unlink()
+
+    if best is None:
+        if any(p.exitcode != 0 for p in procs):
+            return None, "Falha em processo do multi-start paralelo.", custos
+        return None, "Não foi possível encontrar um ciclo Hamiltoniano dentro do limite de tempo. (Pode não existir.)", custos
+    return best, None, custos
+
+
+
 if __name__ == "__main__":
     os.makedirs(PASTA_SAIDAS, exist_ok=True)
 
     nome_arquivo = "Entrada 1500.txt"  
     caminho_entrada = os.path.join(PASTA_ENTRADAS, nome_arquivo)
-    n, mat = ler_instancia(caminho_entrada)
+    if MATRIZ == "esparsa":
+        n, mat = ler_instancia_esparsa(caminho_entrada)
+    elif MATRIZ == "triangular":
+        n, mat = ler_instancia_compacta(caminho_entrada, triangular=True)
+    elif USAR_CACHE:
+        n, mat = ler_instancia_cache(caminho_entrada)
+    elif MATRIZ == "lista":
+        n, mat = ler_instancia(caminho_entrada)
+    else:
+        n, mat = ler_instancia_compacta(caminho_entrada)
 
-    tour, erro = solve_tsp(n, mat, time_limit_s=TIME_LIMIT_S)
+    stats = {}
+    if PROCESSOS > 1 and MATRIZ != "esparsa":
+        tour, erro, custos = solve_tsp_paralelo(n, mat, time_limit_s=TIME_LIMIT_S)
+        print(f"Custo por processo: {custos}")
+    else:
+        tour, erro = solve_tsp(n, mat, time_limit_s=TIME_LIMIT_S, stats=stats)
+        print(f"Construção: {stats['construcao_s']:.2f}s ({stats['construcoes']} tours, "
+              f"{stats['falhas_construcao']} falhas) | Melhoria: {stats['melhoria_s']:.2f}s"
+              f" ({stats['kicks']} kicks, {stats['kicks_melhoraram']} melhoraram)"
+              f" | Limite: {stats['limite_s']:.2f}s")
 
     out = os.path.join(PASTA_SAIDAS, f"2_tsp_{nome_arquivo.replace('.txt','')}_saida.txt")
 
@@ -364,7 +1582,9 @@ if __name__ == "__main__":
         salvar_saida_erro(out, erro)
     else:
         custo = custo_tour(tour, mat)
-        salvar_saida_ok(out, tour, custo)
+        salvar_saida_ok(out, tour, custo, stats.get("limite_inferior"))
         print(f"[OK] {nome_arquivo}")
         print(f"Custo total: {custo}")
+        if stats.get("gap") is not None:
+            print(f"Limite inferior: {stats['limite_inferior']} (gap {100 * stats['gap']:.2f}%)")
         print(f"Saída: {out}")
@@ -1,10 +1,28 @@
+import heapq
+import itertools
+import math
 import os
 import random
+import time
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 PASTA_ENTRADAS = os.path.join(BASE_DIR, "..", "entradas")
 PASTA_SAIDAS = os.path.join(BASE_DIR, "..", "saidas")
 
+# tempo total da busca (reinicios + melhoria)
+# os reinicios param quando o proximo passaria de REINICIOS_FRACAO do tempo
+# (se ja ha solucao viavel); o numero de reinicios sai do prazo, nao e fixo
+TEMPO_LIMITE_S = 2.0
+REINICIOS_FRACAO = 0.25
+
+# para quando (custo - limite inferior) / limite inferior <= GAP_ALVO
+# o limite lagrangeano usa no maximo LB_FRACAO do tempo (None desliga)
+GAP_ALVO = 0.01
+LB_FRACAO = 0.25
+
+# "busca_local" (reinicios + ILS) ou "exato" (branch-and-bound com limite lagrangeano)
+MODO = "busca_local"
+
 
 # 
 # Leitura da instancia
@@ -52,52 +70,310 @@ def construir_barato(NP, NM, cost):
     return [min(range(NP), key=lambda p: cost[p][m]) for m in range(NM)]
 
 
-def reparar(assign, NP, NM, cost, hours, cap):
-    load = calcular_load(assign, NP, hours)
+def construir_regret(NP, NM, cost, hours, cap, ruido=0.0):
+    #Martello-Toth: arrependimento = 2o menor custo viavel - menor custo viavel;
+    #o modulo de maior arrependimento vai para o seu melhor programador que ainda cabe
+    #heap preguicoso (-arrependimento, m, versao); membros[p] = modulos ainda livres com
+    #p entre os 2 melhores. Quando p enche, so esses sao recalculados (carga so cresce,
+    #entao quem deixou de caber nao volta). Sem nenhum que caiba: vai para o mais
+    #barato e o reparar resolve
+    #ruido: custo visto pela construcao = custo * (1 + ruido * aleatorio), para
+    #diversificar reinicios (muda a ordem dos programadores e o arrependimento)
+    #sem NumPy (so biblioteca padrao): em vez de recalcular a matriz de
+    #arrependimentos a cada passo, so os modulos afetados sao reavaliados
+    load = [0] * NP
+    assign = [-1] * NM
+    if ruido:
+        desej = [[c * (1 + ruido * random.random()) for c in row] for row in cost]
+    else:
+        desej = cost
+    ordem = [sorted(range(NP), key=lambda p: (desej[p][m], hours[p][m])) for m in range(NM)]
+    top = [()] * NM
+    versao = [0] * NM
+    membros = [set() for _ in range(NP)]
+
+    def avaliar(m):
+        for p in top[m]:
+            membros[p].discard(m)
+        t = []
+        for p in ordem[m]:
+            if load[p] + hours[p][m] <= cap[p]:
+                t.append(p)
+                if len(t) == 2:
+                    break
+        top[m] = tuple(t)
+        for p in t:
+            membros[p].add(m)
+        if len(t) < 2:
+            r = math.inf  # um destino so (ou nenhum): decide agora
+        else:
+            r = desej[t[1]][m] - desej[t[0]][m]
+        versao[m] += 1
+        return (-r, m, versao[m])
+
+    heap = [avaliar(m) for m in range(NM)]
+    heapq.heapify(heap)
+
+    while heap:
+        _, m, v = heapq.heappop(heap)
+        if assign[m] >= 0 or v != versao[m]:
+            continue
+        p = top[m][0] if top[m] else ordem[m][0]
+        assign[m] = p
+        for q in top[m]:
+            membros[q].discard(m)
+        load[p] += hours[p][m]
 
-    while True:
-        violadores = [p for p in range(NP) if load[p] > cap[p]]
-        if not violadores:
-            return assign, load
+        for m2 in list(membros[p]):
+            if load[p] + hours[p][m2] > cap[p]:
+                heapq.heappush(heap, avaliar(m2))
 
-        p = max(violadores, key=lambda x: load[x] - cap[x])
+    return assign
 
-        melhor = None
-        for m in range(NM):
-            if assign[m] != p:
-                continue
-            for q in range(NP):
-                if q == p:
-                    continue
-                if load[q] + hours[q][m] <= cap[q]:
-                    delta = cost[q][m] - cost[p][m]
-                    cand = (delta, m, q)
-                    if melhor is None or cand < melhor:
-                        melhor = cand
 
-        if melhor is None:
+def modulos_por_programador(assign, NP):
+    modulos = [set() for _ in range(NP)]
+    for m, p in enumerate(assign):
+        modulos[p].add(m)
+    return modulos
+
+
+def reparar(assign, NP, NM, cost, hours, cap):
+    #tira modulos dos programadores estourados, sempre pela transferencia viavel
+    #de menor delta de custo (heap com (delta, m, q, p) de todos os estourados)
+    #entradas velhas sao descartadas ao sair do heap (m ja saiu de p, p ja cabe,
+    #q nao cabe mais); destino so ganha carga, entao o que ficou inviavel nao volta,
+    #exceto quando um estourado passa a caber: ai ele vira destino e entra no heap
+    load = calcular_load(assign, NP, hours)
+    modulos = modulos_por_programador(assign, NP)
+    heap = []
+
+    def empilhar(m, destinos):
+        p = assign[m]
+        cpm = cost[p][m]
+        for q in destinos:
+            if q != p and load[q] + hours[q][m] <= cap[q]:
+                heap.append((cost[q][m] - cpm, m, q, p))
+
+    estourados = [p for p in range(NP) if load[p] > cap[p]]
+    if not estourados:
+        return assign, load
+    for p in estourados:
+        for m in modulos[p]:
+            empilhar(m, range(NP))
+    heapq.heapify(heap)
+    excesso = len(estourados)
+
+    while excesso:
+        if not heap:
             return None
+        _, m, q, p = heapq.heappop(heap)
+        if assign[m] != p or load[p] <= cap[p] or load[q] + hours[q][m] > cap[q]:
+            continue
 
-        _, m, q = melhor
         assign[m] = q
+        modulos[p].discard(m)
+        modulos[q].add(m)
         load[p] -= hours[p][m]
         load[q] += hours[q][m]
 
+        if load[p] <= cap[p]:
+            # p resolvido: vira destino para os modulos dos que ainda estouram
+            excesso -= 1
+            for r in range(NP):
+                if load[r] > cap[r]:
+                    for m2 in modulos[r]:
+                        if load[p] + hours[p][m2] <= cap[p]:
+                            heapq.heappush(heap, (cost[p][m2] - cost[r][m2], m2, p, r))
+
+    return assign, load
+
 
 
 # Busca Local
+# vizinhancas: shift (modulo muda de programador), swap (dois modulos de
+# programadores diferentes trocam) e cadeia de ejecao curta (m1: p -> q sem folga
+# em q, entao m2 sai de q para r). Cargas mantidas a cada movimento, entao cada
+# avaliacao e O(1): delta de custo + folga dos programadores envolvidos
+
+def _mover(m, q, assign, load, modulos, hours):
+    p = assign[m]
+    assign[m] = q
+    modulos[p].discard(m)
+    modulos[q].add(m)
+    load[p] -= hours[p][m]
+    load[q] += hours[q][m]
+
+
+def _passo_shift(assign, load, modulos, NP, NM, cost, hours, cap, alvo=None):
+    #melhor shift de cada modulo (de alvo, se dado); retorna o ganho total
+    ganho = 0
+    for m in range(NM) if alvo is None else alvo:
+        p = assign[m]
+        cpm = cost[p][m]
+        melhor = 0
+        mq = -1
+        for q in range(NP):
+            if q != p and load[q] + hours[q][m] <= cap[q]:
+                d = cost[q][m] - cpm
+                if d < melhor:
+                    melhor = d
+                    mq = q
+        if mq >= 0:
+            _mover(m, mq, assign, load, modulos, hours)
+            ganho -= melhor
+    return ganho
+
+
+def _passo_swap(assign, load, modulos, NP, NM, cost, hours, cap, prazo, alvo=None):
+    #primeiro swap que melhora para cada m1 (de alvo, se dado; par com qualquer m2)
+    ganho = 0
+    for m1 in range(NM) if alvo is None else alvo:
+        if time.time() > prazo:
+            break
+        p = assign[m1]
+        cp1 = cost[p][m1]
+        hp1 = hours[p][m1]
+        for m2 in range(m1 + 1 if alvo is None else 0, NM):
+            q = assign[m2]
+            if q == p:
+                continue
+            d = cost[q][m1] + cost[p][m2] - cp1 - cost[q][m2]
+            if d >= 0:
+                continue
+            if load[p] - hp1 + hours[p][m2] > cap[p]:
+                continue
+            if load[q] - hours[q][m2] + hours[q][m1] > cap[q]:
+                continue
+            _mover(m1, q, assign, load, modulos, hours)
+            _mover(m2, p, assign, load, modulos, hours)
+            ganho -= d
+            break
+    return ganho
+
+
+def _passo_ejecao(assign, load, modulos, NP, NM, cost, hours, cap, prazo, alvo=None):
+    #cadeia de tamanho 2: m1 p -> q (q sem folga), m2 q -> r; r pode ser p
+    #aplica a primeira que melhora e retorna o ganho (0 se nenhuma)
+    #menor[m] = menor custo de m em qualquer programador: corta m2 que nao pode melhorar
+    menor = [min(col) for col in zip(*cost)]
+    for m1 in range(NM) if alvo is None else alvo:
+        if time.time() > prazo:
+            return 0
+        p = assign[m1]
+        cp1 = cost[p][m1]
+        for q in range(NP):
+            if q == p:
+                continue
+            d1 = cost[q][m1] - cp1
+            hq1 = hours[q][m1]
+            for m2 in modulos[q]:
+                if load[q] - hours[q][m2] + hq1 > cap[q]:
+                    continue
+                cq2 = cost[q][m2]
+                if d1 + menor[m2] - cq2 >= 0:
+                    continue
+                for r in range(NP):
+                    if r == q:
+                        continue
+                    d = d1 + cost[r][m2] - cq2
+                    if d >= 0:
+                        continue
+                    livre = load[r] + hours[r][m2]
+                    if r == p:
+                        livre -= hours[p][m1]
+                    if livre > cap[r]:
+                        continue
+                    _mover(m1, q, assign, load, modulos, hours)
+                    _mover(m2, r, assign, load, modulos, hours)
+                    return -d
+    return 0
+
+
+def descida(assign, load, NP, NM, cost, hours, cap, prazo, alvo=None):
+    #shift e swap ate parar; cadeia de ejecao so quando os dois param
+    #alvo: so esses modulos iniciam movimentos (re-otimizacao incremental)
+    modulos = modulos_por_programador(assign, NP)
+    while time.time() < prazo:
+        if _passo_shift(assign, load, modulos, NP, NM, cost, hours, cap, alvo):
+            continue
+        if _passo_swap(assign, load, modulos, NP, NM, cost, hours, cap, prazo, alvo):
+            continue
+        if _passo_ejecao(assign, load, modulos, NP, NM, cost, hours, cap, prazo, alvo):
+            continue
+        break
+    return assign, load
+
+
+def perturbar(assign, load, NP, NM, hours, cap, k):
+    #k passos aleatorios que mantem viabilidade (sem olhar custo): m vai para um
+    #programador com folga ou, se nao houver (instancia apertada), troca com outro modulo
+    for _ in range(k):
+        m = random.randrange(NM)
+        p = assign[m]
+        qs = [q for q in range(NP) if q != p and load[q] + hours[q][m] <= cap[q]]
+        if qs:
+            q = random.choice(qs)
+            assign[m] = q
+            load[p] -= hours[p][m]
+            load[q] += hours[q][m]
+            continue
+        m2 = random.randrange(NM)
+        q = assign[m2]
+        if q == p:
+            continue
+        if load[p] - hours[p][m] + hours[p][m2] > cap[p] or load[q] - hours[q][m2] + hours[q][m] > cap[q]:
+            continue
+        assign[m], assign[m2] = q, p
+        load[p] += hours[p][m2] - hours[p][m]
+        load[q] += hours[q][m] - hours[q][m2]
+
+
+def melhorar(assign, load, NP, NM, cost, hours, cap, tempo_limite_s, custo_alvo=None):
+    #busca local iterada: descida, perturba o melhor, desce de novo, fica com o melhor
+    #custo_alvo: para ao chegar nesse custo (gap ja suficiente)
+    prazo = time.time() + tempo_limite_s
+    assign, load = descida(assign[:], load[:], NP, NM, cost, hours, cap, prazo)
+    melhor, melhor_load = assign[:], load[:]
+    melhor_custo = custo_total(melhor, cost)
+    k = max(2, NM // 10)
+
+    while time.time() < prazo:
+        if custo_alvo is not None and melhor_custo <= custo_alvo:
+            break
+        assign, load = melhor[:], melhor_load[:]
+        perturbar(assign, load, NP, NM, hours, cap, random.randint(2, k))
+        assign, load = descida(assign, load, NP, NM, cost, hours, cap, prazo)
+        c = custo_total(assign, cost)
+        if c <= melhor_custo:
+            melhor, melhor_load, melhor_custo = assign, load, c
+
+    return melhor, melhor_load
+
 
-def busca_local(NP, NM, cost, hours, cap, reinicios=40):
+def busca_local(NP, NM, cost, hours, cap, reinicios=None, tempo_limite_s=TEMPO_LIMITE_S, stats=None):
+    #reinicios (arrependimento + reparo) e a heuristica lagrangeana dao o
+    #ponto de partida; o resto do tempo vai para melhorar a melhor solucao reparada
+    #reinicios: maximo de reinicios (None = quantos couberem no prazo)
+    #stats (dict opcional) recebe limite_inferior e gap
+    if stats is None:
+        stats = {}
+    stats.update(limite_inferior=None, gap=None)
+    t0 = time.time()
     melhor = None
     melhor_custo = None
     melhor_load = None
 
-    for _ in range(reinicios):
-        assign = construir_barato(NP, NM, cost)
-
-        # perturbação leve
-        for _ in range(NM // 4):
-            assign[random.randrange(NM)] = random.randrange(NP)
+    ti = t0
+    for i in (itertools.count() if reinicios is None else range(reinicios)):
+        # so comeca outro reinicio se ele cabe, supondo que dure o mesmo que o anterior
+        agora = time.time()
+        fim = agora - t0 + (agora - ti)
+        ti = agora
+        if i and (fim > tempo_limite_s or (melhor is not None and fim > REINICIOS_FRACAO * tempo_limite_s)):
+            break
+        # arrependimento com capacidade (ruido a partir do 2o reinicio)
+        assign = construir_regret(NP, NM, cost, hours, cap, ruido=0.5 if i else 0.0)
 
         base = reparar(assign, NP, NM, cost, hours, cap)
         if base is None:
@@ -111,17 +387,329 @@ def busca_local(NP, NM, cost, hours, cap, reinicios=40):
             melhor_load = load[:]
             melhor_custo = c
 
+    alvo = None
+    if GAP_ALVO is not None:
+        lb, sol, _ = limite_lagrangeano(NP, NM, cost, hours, cap, melhor_custo, LB_FRACAO * tempo_limite_s)
+        stats["limite_inferior"] = lb
+        if sol is not None and (melhor is None or sol[2] < melhor_custo):
+            melhor, melhor_load, melhor_custo = sol
+        if lb is not None:
+            alvo = int(lb * (1 + GAP_ALVO))
+
+    if melhor is None:
+        return None, None, None
+
+    melhor, melhor_load = melhorar(melhor, melhor_load, NP, NM, cost, hours, cap,
+                                   tempo_limite_s - (time.time() - t0), custo_alvo=alvo)
+    melhor_custo = custo_total(melhor, cost)
+    if stats["limite_inferior"]:
+        stats["gap"] = (melhor_custo - stats["limite_inferior"]) / stats["limite_inferior"]
     return melhor, melhor_load, melhor_custo
 
 
 
+# Re-otimizacao incremental
+# delta (dict, todas as chaves opcionais):
+#   "cap": {p: nova capacidade}
+#   "custo": {p: nova linha de custos}, "horas": {p: nova linha de horas} (linhas
+#       na numeracao antiga dos modulos)
+#   "removidos": modulos que saem (numeracao antiga)
+#   "adicionados": [(custos por programador, horas por programador), ...]
+
+def aplicar_delta(NP, NM, cost, hours, cap, assign, delta):
+    #Retorna (NM, cost, hours, cap, assign, afetados, progs_afetados) ja na numeracao nova
+    #modulos novos entram com assign -1; afetados = modulos novos ou com custo/horas
+    #mudados no programador em que estao; progs_afetados = programadores com capacidade/linha mudada ou que
+    #perderam modulos removidos
+    cap = list(cap)
+    cost = [list(row) for row in cost]
+    hours = [list(row) for row in hours]
+    assign = list(assign)
+
+    progs_afetados = set()
+    for p, c in delta.get("cap", {}).items():
+        if c != cap[p]:
+            cap[p] = c
+            progs_afetados.add(p)
+
+    afetados = set()
+    for chave, mat in (("custo", cost), ("horas", hours)):
+        for p, row in delta.get(chave, {}).items():
+            if len(row) != NM:
+                raise ValueError("Linha do delta com tamanho incorreto.")
+            # so conta para quem esta em p; quem ficou mais barato em p entra depois
+            afetados.update(m for m in range(NM) if assign[m] == p and row[m] != mat[p][m])
+            mat[p] = list(row)
+            progs_afetados.add(p)
+
+    removidos = set(delta.get("removidos", ()))
+    if removidos:
+        progs_afetados.update(assign[m] for m in removidos)
+        manter = [m for m in range(NM) if m not in removidos]
+        novo_idx = {m: k for k, m in enumerate(manter)}
+        cost = [[row[m] for m in manter] for row in cost]
+        hours = [[row[m] for m in manter] for row in hours]
+        assign = [assign[m] for m in manter]
+        afetados = {novo_idx[m] for m in afetados if m in novo_idx}
+        NM = len(manter)
+
+    for cs, hs in delta.get("adicionados", ()):
+        if len(cs) != NP or len(hs) != NP:
+            raise ValueError("Modulo adicionado com tamanho incorreto.")
+        for p in range(NP):
+            cost[p].append(cs[p])
+            hours[p].append(hs[p])
+        assign.append(-1)
+        afetados.add(NM)
+        NM += 1
+
+    return NM, cost, hours, cap, assign, afetados, progs_afetados
+
+
+def reotimizar(assign_anterior, NP, NM, cost, hours, cap, delta, tempo_limite_s=TEMPO_LIMITE_S):
+    #Retorna ((NM, cost, hours, cap), assign, load, custo) da instancia nova
+    #assign None se o reparo nao achou solucao viavel
+    #modulos novos no mais barato que cabe -> reparar (so mexe nos estourados) ->
+    #descida com movimentos partindo so dos modulos afetados
+    prazo = time.time() + tempo_limite_s
+    NM, cost, hours, cap, assign, afetados, progs = aplicar_delta(
+        NP, NM, cost, hours, cap, assign_anterior, delta)
+    inst = (NM, cost, hours, cap)
+
+    load = [0] * NP
+    for m, p in enumerate(assign):
+        if p >= 0:
+            load[p] += hours[p][m]
+    for m, p in enumerate(assign):
+        if p < 0:
+            cabem = [q for q in range(NP) if load[q] + hours[q][m] <= cap[q]]
+            q = min(cabem or range(NP), key=lambda q: cost[q][m])
+            assign[m] = q
+            load[q] += hours[q][m]
+
+    antes = assign[:]
+    base = reparar(assign, NP, NM, cost, hours, cap)
+    if base is None:
+        return inst, None, None, None
+    assign, load = base
+
+    # afetados: mudados, novos, movidos pelo reparo e quem ficaria mais barato
+    # num programador que mudou e ainda cabe nele (ex.: ganhou capacidade)
+    for m in range(NM):
+        if assign[m] != antes[m]:
+            afetados.add(m)
+            progs.add(antes[m])
+            progs.add(assign[m])
+    for p in progs:
+        cp = cost[p]
+        hp = hours[p]
+        folga = cap[p] - load[p]
+        afetados.update(m for m in range(NM) if cp[m] < cost[assign[m]][m] and hp[m] <= folga)
+
+    if afetados:
+        assign, load = descida(assign, load, NP, NM, cost, hours, cap, prazo, sorted(afetados))
+    return inst, assign, load, custo_total(assign, cost)
+
+
+
+# Relaxacao lagrangeana (capacidades)
+# L(lam) = sum_m min_p (cost[p][m] + lam[p] * hours[p][m]) - sum_p lam[p] * cap[p], lam >= 0
+# cada modulo escolhe sozinho o programador de menor custo penalizado; L(lam) <= otimo
+# subgradiente: g[p] = carga relaxada de p - cap[p]; lam[p] = max(0, lam[p] + t * g[p])
+# heuristica lagrangeana: a escolha relaxada de cada iteracao passa pelo reparar
+
+def limite_lagrangeano(NP, NM, cost, hours, cap, ub, tempo_limite_s, max_iter=500):
+    #retorna (limite inferior inteiro ou None, melhor (assign, load, custo) viavel ou None,
+    #multiplicadores do melhor limite)
+    t0 = time.time()
+    lam = [0.0] * NP
+    melhor_lb = None
+    melhor_lam = lam
+    melhor_sol = None
+    alfa = 2.0
+    sem_melhora = 0
+    if ub is None:
+        ub = sum(max(cost[p][m] for p in range(NP)) for m in range(NM))
+
+    for _ in range(max_iter):
+        if time.time() - t0 > tempo_limite_s:
+            break
+
+        # subproblema: por modulo, o menor custo penalizado (linha a linha)
+        pen = [[c + lp * h for c, h in zip(cost[p], hours[p])] for p, lp in enumerate(lam)]
+        x = [min(range(NP), key=col.__getitem__) for col in zip(*pen)]
+        L = sum(pen[p][m] for m, p in enumerate(x)) - sum(lp * cp for lp, cp in zip(lam, cap))
+
+        lb = math.ceil(L - 1e-6)  # custos inteiros
+        if melhor_lb is None or lb > melhor_lb:
+            melhor_lb = lb
+            melhor_lam = lam
+            sem_melhora = 0
+        else:
+            sem_melhora += 1
+            if sem_melhora >= 20:
+                alfa /= 2
+                sem_melhora = 0
+
+        # heuristica: torna a escolha relaxada viavel
+        rep = reparar(x[:], NP, NM, cost, hours, cap)
+        if rep is not None:
+            c = custo_total(rep[0], cost)
+            if melhor_sol is None or c < melhor_sol[2]:
+                melhor_sol = (rep[0], rep[1], c)
+                ub = min(ub, c)
+
+        if melhor_lb >= ub or alfa < 1e-4:
+            break
+
+        g = calcular_load(x, NP, hours)
+        for p in range(NP):
+            g[p] -= cap[p]
+        # lam = 0 com carga folgada nao pode descer mais
+        norma = sum(gp * gp for gp, lp in zip(g, lam) if gp > 0 or lp > 0)
+        if norma == 0:
+            break  # escolha relaxada viavel e complementar: e otima
+        t = alfa * (ub - L) / norma
+        lam = [max(0.0, lp + t * gp) for lp, gp in zip(lam, g)]
+
+    return melhor_lb, melhor_sol, melhor_lam
+
+
+
+# Exato: branch-and-bound
+# DFS nos modulos (maior arrependimento primeiro: diferenca entre o 2o e o 1o menor
+# custo), programadores em ordem de custo; capacidade conferida contra a carga atual.
+# Limite em cada no = max(soma dos menores custos que ainda cabem,
+# limite lagrangeano com os multiplicadores fixos da subida):
+#   custo + sum_m min_p (c + lam[p] h) - sum_p lam[p] (cap[p] - carga[p])
+# Incumbente vem da busca_local; se o limite da raiz ja encosta nele, acabou
+
+def resolver_exato(NP, NM, cost, hours, cap, tempo_limite_s=60.0, max_nos=None, incumbente=None):
+    #Retorna assign, load, custo, otimo (True se o otimo foi provado)
+    #assign None se nao ha solucao viavel (otimo=True: provado que nao existe)
+    t0 = time.time()
+    prazo = None if tempo_limite_s is None else t0 + tempo_limite_s
+
+    if incumbente is None:
+        orc = TEMPO_LIMITE_S if tempo_limite_s is None else min(TEMPO_LIMITE_S, tempo_limite_s / 4)
+        assign, load, custo = busca_local(NP, NM, cost, hours, cap, tempo_limite_s=orc)
+    else:
+        assign = incumbente[:]
+        load = calcular_load(assign, NP, hours)
+        custo = custo_total(assign, cost)
+        if any(load[p] > cap[p] for p in range(NP)):
+            assign = load = custo = None
+
+    orc = TEMPO_LIMITE_S if tempo_limite_s is None else tempo_limite_s / 4
+    lb, sol, lam = limite_lagrangeano(NP, NM, cost, hours, cap, custo, orc)
+    if sol is not None and (custo is None or sol[2] < custo):
+        assign, load, custo = sol
+    if custo is not None and lb is not None and lb >= custo:
+        return assign, load, custo, True
+
+    melhor = [custo if custo is not None else math.inf, assign]
+
+    def arrependimento(m):
+        cs = sorted(cost[p][m] for p in range(NP))
+        return cs[1] - cs[0] if NP > 1 else 0
+    ordem = sorted(range(NM), key=lambda m: (-arrependimento(m), m))
+    progs = [sorted(range(NP), key=lambda p: cost[p][m]) for m in ordem]
+
+    carga = [0] * NP
+    atual = [-1] * NM
+    nos = 0
+    terminou = True
+
+    def limite(k, c):
+        #None se algum modulo restante nao cabe em ninguem
+        simples = c
+        lagr = c - sum(lp * (cp - ld) for lp, cp, ld in zip(lam, cap, carga))
+        for j in range(k, NM):
+            m = ordem[j]
+            mc = None
+            ml = None
+            for p in range(NP):
+                h = hours[p][m]
+                if carga[p] + h <= cap[p]:
+                    cpm = cost[p][m]
+                    if mc is None or cpm < mc:
+                        mc = cpm
+                    v = cpm + lam[p] * h
+                    if ml is None or v < ml:
+                        ml = v
+            if mc is None:
+                return None
+            simples += mc
+            lagr += ml
+        return max(simples, math.ceil(lagr - 1e-6))
+
+    # DFS iterativa: pilha[k] = indice em progs[k] do proximo programador a tentar
+    # no nivel k; atual[m] = -1 enquanto o modulo m nao esta designado
+    pilha = []
+    c = 0
+    while True:
+        k = len(pilha)
+        nos += 1
+        if nos % 1024 == 0:
+            if (prazo is not None and time.time() > prazo) or (max_nos is not None and nos > max_nos):
+                terminou = False
+                break
+
+        if k == NM:
+            if c < melhor[0]:
+                melhor[0] = c
+                melhor[1] = atual[:]
+        else:
+            b = limite(k, c)
+            if b is not None and b < melhor[0]:
+                pilha.append(0)
+
+        # proximo filho: desfaz a designacao do nivel de cima e tenta o proximo
+        # programador que cabe; nivel esgotado sai da pilha
+        while pilha:
+            k = len(pilha) - 1
+            m = ordem[k]
+            p = atual[m]
+            if p >= 0:
+                carga[p] -= hours[p][m]
+                c -= cost[p][m]
+                atual[m] = -1
+            ps = progs[k]
+            i = pilha[k]
+            while i < NP and carga[ps[i]] + hours[ps[i]][m] > cap[ps[i]]:
+                i += 1
+            if i < NP:
+                p = ps[i]
+                pilha[k] = i + 1
+                carga[p] += hours[p][m]
+                c += cost[p][m]
+                atual[m] = p
+                break
+            pilha.pop()
+        if not pilha:
+            break
+
+    assign = melhor[1]
+    if assign is None:
+        return None, None, None, terminou
+    return assign, calcular_load(assign, NP, hours), custo_total(assign, cost), terminou
+
+
+
 # Saída
 
-def salvar_saida(caminho, assign, load, cap, cost):
+def salvar_saida(caminho, assign, load, cap, cost, limite=None, otimo=None):
     with open(caminho, "w", encoding="utf-8") as f:
         for m, p in enumerate(assign, 1):
             f.write(f"Módulo {m} -> Programador {p+1}\n")
-        f.write(f"\nCusto total: {custo_total(assign, cost)}\n\n")
+        total = custo_total(assign, cost)
+        f.write(f"\nCusto total: {total}\n")
+        if limite:
+            f.write(f"Limite inferior (lagrangeano): {limite}\n")
+            f.write(f"Gap: {100.0 * (total - limite) / limite:.2f}%\n")
+        if otimo is not None:
+            f.write(f"Ótimo provado: {'sim' if otimo else 'não'}\n")
+        f.write("\n")
         for i in range(len(cap)):
             f.write(f"P{i+1}: {load[i]} / {cap[i]}\n")
 
@@ -135,13 +723,22 @@ if __name__ == "__main__":
 
     NP, NM, cost, hours, cap = ler_instancia(caminho)
 
-    assign, load, total = busca_local(NP, NM, cost, hours, cap)
+    stats = {"limite_inferior": None, "gap": None}
+    otimo = None
+    if MODO == "exato":
+        assign, load, total, otimo = resolver_exato(NP, NM, cost, hours, cap)
+    else:
+        assign, load, total = busca_local(NP, NM, cost, hours, cap, stats=stats)
 
     if assign is None:
         print("[ERRO] Nenhuma solução viável encontrada.")
     else:
         out = os.path.join(PASTA_SAIDAS, f"3_designacao_{nome_arquivo.replace('.txt','')}_saida.txt")
-        salvar_saida(out, assign, load, cap, cost)
+        salvar_saida(out, assign, load, cap, cost, stats["limite_inferior"], otimo)
         print("[OK]", nome_arquivo)
         print("Custo total:", total)
+        if otimo is not None:
+            print(f"Ótimo provado: {'sim' if otimo else 'não'}")
+        if stats["gap"] is not None:
+            print(f"Limite inferior: {stats['limite_inferior']} (gap {100 * stats['gap']:.2f}%)")
         print("Saída:", out)